@@ -5,14 +5,22 @@ Demonstrates proper agent framework usage with ReAct pattern
 
 from langchain.agents import AgentType, initialize_agent, AgentExecutor
 from langchain.llms.base import LLM
-from langchain.callbacks.manager import CallbackManagerForLLMRun
+from langchain.callbacks.base import BaseCallbackHandler
+from langchain.callbacks.manager import AsyncCallbackManagerForLLMRun, CallbackManagerForLLMRun
 from langchain_core.language_models.llms import LLM as CoreLLM
 from langchain.tools import BaseTool
 from google import genai
 from google.genai import types
-from typing import Optional, List, Any, Dict
+from typing import Optional, List, Any, Dict, Iterator
+import ast
+import asyncio
 import json
+import operator
 import os
+import queue
+import re
+import threading
+from concurrent.futures import Future
 from datetime import datetime
 
 # Import working tools instead
@@ -20,7 +28,355 @@ from datetime import datetime
 # from tools.calculator_tool import CalculatorTool
 # from tools.file_operations_tool import FileOperationsTool
 from memory.conversation_memory import ResearchAgentMemory
-from config import GEMINI_API_KEY, GEMINI_MODEL, MAX_ITERATIONS, VERBOSE, REPORTS_DIR, DATA_DIR
+from memory.response_cache import ResearchResponseCache
+import config
+from config import (
+    GEMINI_API_KEY, GEMINI_MODEL, MAX_ITERATIONS, VERBOSE, EMBEDDING_MODEL, SUMMARY_MODEL,
+    AGENT_MAX_EXECUTION_TIME,
+)
+
+
+# Shared Gemini client so every LLM/tool instance reuses one connection pool
+_GEMINI_CLIENT: Optional[genai.Client] = None
+
+
+def get_gemini_client() -> genai.Client:
+    """Return the process-wide Gemini client, creating it on first use"""
+    global _GEMINI_CLIENT
+    if _GEMINI_CLIENT is None:
+        _GEMINI_CLIENT = genai.Client(
+            api_key=GEMINI_API_KEY,
+            http_options=types.HttpOptions(timeout=AGENT_MAX_EXECUTION_TIME * 1000),
+        )
+    return _GEMINI_CLIENT
+
+
+# System instruction to prevent hallucinated tool observations
+_SYSTEM_INSTRUCTION = """You are an AI research agent that uses tools. CRITICAL RULES:
+1. When you need to use a tool, output ONLY the Action and Action Input
+2. Do NOT generate fake observations or responses  
+3. Stop immediately after outputting Action Input
+4. Wait for the actual tool result before continuing
+
+Format your response exactly like this:
+Thought: [your reasoning]
+Action: [tool_name]  
+Action Input: [input_for_tool]
+
+Then STOP. Do not continue writing."""
+
+# Generation configs are immutable per call, so build them once at import
+_GEN_CFG = types.GenerateContentConfig(
+    thinking_config=types.ThinkingConfig(thinking_budget=0),
+)
+# Tool prompts carry the instruction in the dedicated field so it stays
+# in the static, cacheable prefix across ReAct iterations
+_TOOL_CFG = types.GenerateContentConfig(
+    thinking_config=types.ThinkingConfig(thinking_budget=0),
+    system_instruction=_SYSTEM_INSTRUCTION,
+)
+_SEARCH_CFG = types.GenerateContentConfig(
+    thinking_config=types.ThinkingConfig(thinking_budget=0),
+    tools=[types.Tool(googleSearch=types.GoogleSearch())],
+)
+
+
+def _user_contents(text: str) -> List[types.Content]:
+    """
+    Wrap a prompt as a single user turn for generate_content
+    Uses model_construct to skip Pydantic validation, since the input is always a str
+    """
+    part = types.Part.model_construct(text=text)
+    return [types.Content.model_construct(role="user", parts=[part])]
+
+
+# Calculator input handling, compiled once instead of per tool call
+_SANITIZE = re.compile(r'[a-zA-Z\s]')
+_PERCENT_OF = re.compile(r'(-?\d+(?:\.\d+)?)\s*%\s*of\s*(-?\d+(?:\.\d+)?)', re.IGNORECASE)
+_BIN_OPS = {
+    ast.Add: operator.add,
+    ast.Sub: operator.sub,
+    ast.Mult: operator.mul,
+    ast.Div: operator.truediv,
+    ast.FloorDiv: operator.floordiv,
+    ast.Mod: operator.mod,
+    ast.Pow: operator.pow,
+}
+_UNARY_OPS = {
+    ast.UAdd: operator.pos,
+    ast.USub: operator.neg,
+}
+# Integer results are capped by size, since nested powers or products of
+# individually small operands can still grow without bound
+_MAX_RESULT_BITS = 4096
+
+# Query classes answered without running the ReAct loop; % is left out
+# because inputs like "50%" are percentages, not modulo expressions
+_ARITHMETIC_QUERY = re.compile(r'(?=.*\d)[\d\s+\-*/().^]+')
+_GREETING_QUERY = re.compile(
+    r'(hi|hello|hey|thanks|thank you|good (morning|afternoon|evening))[\s!.?]*',
+    re.IGNORECASE,
+)
+_GREETING_RESPONSE = (
+    "Hello! I'm a research agent. Ask me a research question, a calculation, "
+    "or to create a report on a topic."
+)
+_REJECT_RESPONSE = "Please provide a research question of at least 3 characters."
+
+# Prompt for folding old conversation turns into the session summary
+_SUMMARY_PROMPT = """Update the running summary of a research conversation.
+
+Current summary:
+{summary}
+
+Earlier conversation turns:
+{transcript}
+
+Write the updated summary in at most 150 words. Keep research topics, key findings and open questions. Reply with the summary only."""
+
+# Short questions without these terms get one Gemini call instead of the agent;
+# the terms cover tool requests and facts that change over time
+_DIRECT_ANSWER_MAX_WORDS = 6
+_NEEDS_TOOLS = re.compile(
+    r'\d|\b(?:research|analy[sz]e|study|investigate|examine|explore|report|trends?|'
+    r'statistics|data|search|find|latest|news|today|current|recent|compare|file|save|create|'
+    r'ceo|president|prime minister|leader|head|owner|population|price|cost|worth|rate|'
+    r'weather|stock|score|winner|champion|ranking|richest|version|release)s?\b',
+    re.IGNORECASE,
+)
+
+# Tools whose effects would be skipped if their run were replayed from cache
+_SIDE_EFFECT_TOOLS = frozenset({"file_operations"})
+
+
+def _is_replayable(inputs: Dict[str, str], response: Dict[str, Any]) -> bool:
+    """Whether an agent run's answer may be stored in the response cache"""
+    # Runs that hit the iteration or time limit are incomplete, and answers
+    # shaped by the conversation don't carry over to other callers
+    if response.get("output", "").startswith("Agent stopped") or inputs.get("session_context"):
+        return False
+    return not any(action.tool in _SIDE_EFFECT_TOOLS for action, _ in response.get("intermediate_steps", ()))
+
+
+def _parse_report_command(command: str) -> Optional[tuple]:
+    """
+    Parse file_operations input into (title, content)
+    
+    Accepts a JSON object with title and content fields, or the legacy
+    'create_report:title:content' string. Returns None if neither matches.
+    """
+    text = command.strip()
+    
+    if text.startswith("{"):
+        try:
+            data = json.loads(text)
+        except ValueError:
+            return None
+        title, content = data.get("title"), data.get("content")
+        if isinstance(title, str) and isinstance(content, str):
+            return title, content
+        return None
+    
+    action, _, rest = text.partition(":")
+    if action != "create_report":
+        return None
+    title, separator, content = rest.partition(":")
+    if not separator:
+        return None
+    return title, content
+
+
+def _check_result_size(op: ast.operator, left, right):
+    """Reject integer operations whose result would exceed _MAX_RESULT_BITS"""
+    if not (isinstance(left, int) and isinstance(right, int)):
+        # Float arithmetic is fixed-size; overflow raises OverflowError
+        return
+    
+    if isinstance(op, ast.Pow) and right > 0 and abs(left) > 1:
+        bits = abs(left).bit_length() * right
+    elif isinstance(op, ast.Mult):
+        bits = abs(left).bit_length() + abs(right).bit_length()
+    else:
+        return
+    
+    if bits > _MAX_RESULT_BITS:
+        raise ValueError("result too large")
+
+
+def _eval_node(node: ast.AST):
+    """Evaluate an arithmetic expression tree without calling eval"""
+    if isinstance(node, ast.Constant) and isinstance(node.value, (int, float)):
+        return node.value
+    if isinstance(node, ast.BinOp) and type(node.op) in _BIN_OPS:
+        left = _eval_node(node.left)
+        right = _eval_node(node.right)
+        _check_result_size(node.op, left, right)
+        return _BIN_OPS[type(node.op)](left, right)
+    if isinstance(node, ast.UnaryOp) and type(node.op) in _UNARY_OPS:
+        return _UNARY_OPS[type(node.op)](_eval_node(node.operand))
+    raise ValueError(f"unsupported expression element: {type(node).__name__}")
+
+
+# Agent prompt templates, built once at import
+_AGENT_PREFIX = """You are an intelligent AI Research Agent powered by LangChain framework. Your mission is to conduct thorough, accurate research on any topic and provide comprehensive insights.
+
+CAPABILITIES:
+- Web Search: Access current information from the internet
+- Data Analysis: Perform mathematical calculations and statistical analysis  
+- Report Generation: Create professional research reports
+- Memory: Maintain conversation context and build upon previous research
+
+RESEARCH METHODOLOGY:
+1. UNDERSTAND the user's research request thoroughly
+2. PLAN your research approach using multiple information sources
+3. SEARCH for current, reliable information using web search
+4. ANALYZE data and perform calculations when needed
+5. SYNTHESIZE findings into coherent insights
+6. GENERATE reports for comprehensive research
+
+BEST PRACTICES:
+- Always verify important facts with multiple searches
+- Use specific, targeted search queries for better results
+- Provide sources and citations when possible
+- Break complex research into manageable steps
+- Build upon previous conversation context
+- Create reports for substantial research findings
+
+Remember: You are using the LangChain framework to demonstrate professional agent development practices."""
+
+_AGENT_SUFFIX = """
+Research Context:
+{research_context}
+
+Current Request: {input}
+
+Conversation History:
+{chat_history}
+
+Think step by step about how to best research this topic.
+
+{agent_scratchpad}"""
+
+# Default ReAct suffix with the research context ahead of the question
+_AGENT_SUMMARY_SUFFIX = """Begin!
+
+{session_context}Question: {input}
+Thought:{agent_scratchpad}"""
+
+
+# Longest a report tool call waits for its file to be written
+_REPORT_WRITE_TIMEOUT = 30
+
+
+class _ReportWriter:
+    """
+    Writes research reports on a daemon thread
+    Keeps disk I/O off the agent's ReAct loop; each write's outcome is
+    reported through the Future returned by submit()
+    """
+    
+    def __init__(self):
+        self._queue: "queue.Queue[tuple]" = queue.Queue()
+        self._thread: Optional[threading.Thread] = None
+        self._start_lock = threading.Lock()
+    
+    def submit(self, filepath: str, content: str) -> Future:
+        """Queue a report for writing; the Future resolves once it's on disk"""
+        if self._thread is None:
+            with self._start_lock:
+                if self._thread is None:
+                    self._thread = threading.Thread(target=self._writer_loop, name="report-writer", daemon=True)
+                    self._thread.start()
+        written: Future = Future()
+        self._queue.put((filepath, content, written))
+        return written
+    
+    def flush(self):
+        """Block until every queued report has been written"""
+        if self._thread is not None:
+            self._queue.join()
+    
+    def _writer_loop(self):
+        while True:
+            filepath, content, written = self._queue.get()
+            try:
+                # The directory may have been removed since the last report
+                directory = os.path.dirname(filepath)
+                if directory:
+                    os.makedirs(directory, exist_ok=True)
+                
+                with open(filepath, 'w', encoding='utf-8') as f:
+                    f.write(content)
+                print(f"[FILE TOOL] Wrote {filepath}")
+                written.set_result(filepath)
+            except Exception as e:
+                print(f"[FILE TOOL] ERROR: Could not write {filepath}: {str(e)}")
+                written.set_exception(e)
+            finally:
+                self._queue.task_done()
+
+
+_REPORT_WRITER = _ReportWriter()
+
+
+# Marker after which a ReAct step's output is the user-facing answer
+_FINAL_ANSWER_MARKER = "Final Answer:"
+# Where MRKLOutputParser may cut or reject an answer, so live streaming stops
+_STREAM_ACTION = re.compile(r'Action\s*\d*\s*:')
+_STREAM_STOP = re.compile(r'\n\n|Action\s*\d*\s*:|' + re.escape(_FINAL_ANSWER_MARKER))
+# Trailing characters held back in case they begin a stop pattern
+_STREAM_HOLDBACK = len(_FINAL_ANSWER_MARKER) + 3
+
+
+class _FinalAnswerStreamer(BaseCallbackHandler):
+    """
+    Forwards the answer after "Final Answer:" to a queue as it streams
+    Only text the output parser is certain to keep is sent: streaming stops
+    at a blank line or a hallucinated action, and stream() sends the rest
+    of the stored result once the run finishes.
+    """
+    
+    def __init__(self, sink: "queue.Queue[Optional[str]]"):
+        self._sink = sink
+        self._reset()
+    
+    def _reset(self):
+        self._text = ""
+        self._answer_start: Optional[int] = None
+        self._emitted = 0
+        self._stopped = False
+    
+    def on_llm_start(self, serialized: Dict[str, Any], prompts: List[str], **kwargs: Any):
+        self._reset()
+    
+    def on_llm_new_token(self, token: str, **kwargs: Any):
+        if self._stopped:
+            return
+        self._text += token
+        
+        if self._answer_start is None:
+            index = self._text.find(_FINAL_ANSWER_MARKER)
+            if index == -1:
+                return
+            # The parser rejects an answer that follows an action
+            if _STREAM_ACTION.search(self._text, 0, index):
+                self._stopped = True
+                return
+            self._answer_start = index + len(_FINAL_ANSWER_MARKER)
+        
+        answer = self._text[self._answer_start:]
+        stop = _STREAM_STOP.search(answer)
+        if stop is not None:
+            answer = answer[:stop.start()]
+            self._stopped = True
+        else:
+            answer = answer[:max(len(answer) - _STREAM_HOLDBACK, 0)]
+        
+        # Stripping keeps the sent text a prefix of the parser's stripped output
+        answer = answer.strip()
+        if len(answer) > self._emitted:
+            self._sink.put(answer[self._emitted:])
+            self._emitted = len(answer)
 
 
 class GeminiLLM(CoreLLM):
@@ -32,7 +388,7 @@ class GeminiLLM(CoreLLM):
     def __init__(self):
         super().__init__()
         # Use object.__setattr__ to bypass Pydantic validation
-        object.__setattr__(self, 'client', genai.Client(api_key=GEMINI_API_KEY))
+        object.__setattr__(self, 'client', get_gemini_client())
         object.__setattr__(self, 'model', GEMINI_MODEL)
     
     @property
@@ -48,47 +404,64 @@ class GeminiLLM(CoreLLM):
     ) -> str:
         """Call Gemini API and return response"""
         try:
-            # Add system instruction to prevent hallucination  
-            system_instruction = """You are an AI research agent that uses tools. CRITICAL RULES:
-1. When you need to use a tool, output ONLY the Action and Action Input
-2. Do NOT generate fake observations or responses  
-3. Stop immediately after outputting Action Input
-4. Wait for the actual tool result before continuing
-
-Format your response exactly like this:
-Thought: [your reasoning]
-Action: [tool_name]  
-Action Input: [input_for_tool]
-
-Then STOP. Do not continue writing."""
-
-            if "Action:" in prompt:
-                # If this is a tool execution prompt, add strict instruction
-                enhanced_prompt = system_instruction + "\n\n" + prompt
-            else:
-                enhanced_prompt = prompt
-                
-            contents = [
-                types.Content(
-                    role="user",
-                    parts=[types.Part.from_text(text=enhanced_prompt)],
-                ),
-            ]
-            
-            generate_content_config = types.GenerateContentConfig(
-                thinking_config=types.ThinkingConfig(thinking_budget=0),
+            # If this is a tool execution prompt, add strict system instruction
+            config = _TOOL_CFG if "Action:" in prompt else _GEN_CFG
+            
+            # Stream only when a caller asked for tokens; otherwise the agent
+            # just consumes the final string
+            if run_manager is not None and run_manager.metadata.get("stream_tokens"):
+                return self._call_streaming(prompt, config, run_manager)
+            
+            response = self.client.models.generate_content(
+                model=self.model,
+                contents=_user_contents(prompt),
+                config=config,
             )
             
-            response_text = ""
-            for chunk in self.client.models.generate_content_stream(
+            return response.text or ""
+            
+        except Exception as e:
+            return f"Error calling Gemini: {str(e)}"
+    
+    def _call_streaming(
+        self,
+        prompt: str,
+        config: types.GenerateContentConfig,
+        run_manager: CallbackManagerForLLMRun,
+    ) -> str:
+        """Stream a Gemini response, reporting each chunk as a new token"""
+        chunks = []
+        
+        for chunk in self.client.models.generate_content_stream(
+            model=self.model,
+            contents=_user_contents(prompt),
+            config=config,
+        ):
+            text = chunk.text
+            if text:
+                chunks.append(text)
+                run_manager.on_llm_new_token(text)
+        
+        return "".join(chunks)
+    
+    async def _acall(
+        self,
+        prompt: str,
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[AsyncCallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> str:
+        """Call Gemini API asynchronously and return response"""
+        try:
+            config = _TOOL_CFG if "Action:" in prompt else _GEN_CFG
+            
+            response = await self.client.aio.models.generate_content(
                 model=self.model,
-                contents=contents,
-                config=generate_content_config,
-            ):
-                if chunk.text:
-                    response_text += chunk.text
+                contents=_user_contents(prompt),
+                config=config,
+            )
             
-            return response_text
+            return response.text or ""
             
         except Exception as e:
             return f"Error calling Gemini: {str(e)}"
@@ -106,36 +479,87 @@ class LangChainResearchAgent:
     - Comprehensive research capabilities
     """
     
-    def __init__(self):
-        """Initialize the LangChain research agent"""
+    def __init__(self, session_context: bool = False):
+        """
+        Initialize the LangChain research agent
+        
+        Args:
+            session_context: Summarize the conversation and show it to the
+                agent. Memory is shared by every caller of this instance, so
+                only enable it for a single user, never for the API.
+        """
+        self.session_context = session_context
+        
         # Initialize LLM
         self.llm = GeminiLLM()
         
         # Initialize working tools
         self.tools = self._create_working_tools()
+        self._tools_by_name = {tool.name: tool for tool in self.tools}
+        
+        # Initialize enhanced memory; summaries only pay off when prompts use them
+        self.memory = ResearchAgentMemory(
+            summarize_fn=self._summarize_history if session_context else None
+        )
         
-        # Initialize enhanced memory
-        self.memory = ResearchAgentMemory()
+        # Cache responses for exact and near-duplicate queries
+        self.response_cache = ResearchResponseCache(embed_fn=self._embed_query)
         
         # Create directories
         self._ensure_directories()
         
-        # Initialize LangChain ReAct agent (without memory for now)
-        # Use standard agent with enhanced prompting to prevent hallucination
+        # Initialize LangChain ReAct agent; with session_context, memory
+        # reaches it as the research context in the prompt. Standard agent
+        # with enhanced prompting to prevent hallucination
         self.agent_executor = initialize_agent(
             tools=self.tools,
             llm=self.llm,
             agent=AgentType.ZERO_SHOT_REACT_DESCRIPTION,
             verbose=VERBOSE,
             max_iterations=MAX_ITERATIONS,
-            handle_parsing_errors=True
+            max_execution_time=AGENT_MAX_EXECUTION_TIME,
+            handle_parsing_errors=True,
+            # Lets callers see which tools ran before caching the answer
+            return_intermediate_steps=True,
+            agent_kwargs={
+                "suffix": _AGENT_SUMMARY_SUFFIX,
+                "input_variables": ["input", "session_context", "agent_scratchpad"],
+            }
         )
     
+    def _agent_inputs(self, query: str) -> Dict[str, str]:
+        """
+        Inputs for one agent run, carrying the research context into the
+        prompt if enabled: the session summary, research topics and the
+        recent turns. Call before the query is recorded in memory.
+        """
+        context = self.memory.get_research_context(empty="") if self.session_context else ""
+        if context:
+            context = f"Research context:\n{context}\n\n"
+        return {"input": query, "session_context": context}
+    
+    def _embed_query(self, text: str) -> List[float]:
+        """Embed a query for the semantic response cache"""
+        result = get_gemini_client().models.embed_content(
+            model=EMBEDDING_MODEL,
+            contents=text,
+        )
+        return result.embeddings[0].values
+    
+    def _summarize_history(self, summary: str, messages: List[Any]) -> str:
+        """Fold old conversation messages into the session summary"""
+        transcript = "\n".join(f"{message.type}: {message.content}" for message in messages)
+        response = get_gemini_client().models.generate_content(
+            model=SUMMARY_MODEL,
+            contents=_user_contents(_SUMMARY_PROMPT.format(summary=summary or "None", transcript=transcript)),
+            config=_GEN_CFG,
+        )
+        return response.text or summary
+    
     def _ensure_directories(self):
         """Create necessary directories"""
-        # Import config values at runtime to get current values
-        from config import REPORTS_DIR as current_reports_dir, DATA_DIR as current_data_dir
-        for directory in [current_reports_dir, current_data_dir]:
+        # Read config attributes at call time so runtime overrides apply
+        for directory in [config.REPORTS_DIR, config.DATA_DIR]:
             if not os.path.exists(directory):
                 os.makedirs(directory)
     
@@ -147,24 +571,27 @@ class LangChainResearchAgent:
             
             def __init__(self):
                 super().__init__()
-                object.__setattr__(self, 'client', genai.Client(api_key=GEMINI_API_KEY))
+                object.__setattr__(self, 'client', get_gemini_client())
             
             def _run(self, query: str) -> str:
                 try:
-                    contents = [types.Content(role="user", parts=[types.Part.from_text(text=f"Search for: {query}")])]
-                    tools = [types.Tool(googleSearch=types.GoogleSearch())]
-                    config = types.GenerateContentConfig(
-                        thinking_config=types.ThinkingConfig(thinking_budget=0),
-                        tools=tools,
+                    response = self.client.models.generate_content(
+                        model=GEMINI_MODEL,
+                        contents=_user_contents(f"Search for: {query}"),
+                        config=_SEARCH_CFG,
                     )
-                    
-                    response_text = ""
-                    for chunk in self.client.models.generate_content_stream(
-                        model=GEMINI_MODEL, contents=contents, config=config
-                    ):
-                        if chunk.text:
-                            response_text += chunk.text
-                    return response_text
+                    return response.text or ""
+                except Exception as e:
+                    return f"Search error: {str(e)}"
+            
+            async def _arun(self, query: str) -> str:
+                try:
+                    response = await self.client.aio.models.generate_content(
+                        model=GEMINI_MODEL,
+                        contents=_user_contents(f"Search for: {query}"),
+                        config=_SEARCH_CFG,
+                    )
+                    return response.text or ""
                 except Exception as e:
                     return f"Search error: {str(e)}"
         
@@ -175,21 +602,19 @@ class LangChainResearchAgent:
             def _run(self, expression: str) -> str:
                 try:
                     # Handle common calculations
-                    if "%" in expression and "of" in expression:
-                        parts = expression.replace("%", "").split("of")
-                        if len(parts) == 2:
-                            percentage = float(parts[0].strip())
-                            value = float(parts[1].strip())
-                            result = (percentage / 100) * value
-                            return f"{percentage}% of {value} = {result}"
+                    match = _PERCENT_OF.fullmatch(expression.strip())
+                    if match:
+                        percentage = float(match.group(1))
+                        value = float(match.group(2))
+                        result = (percentage / 100) * value
+                        return f"{percentage}% of {value} = {result}"
                     
-                    # Simple math evaluation (safe)
-                    import re
-                    safe_expr = re.sub(r'[a-zA-Z\s]', '', expression)
-                    safe_expr = safe_expr.replace('^', '**')
+                    # Simple math evaluation over a whitelisted AST (safe)
+                    safe_expr = _SANITIZE.sub('', expression).replace('^', '**')
                     
-                    if safe_expr.strip():
-                        result = eval(safe_expr, {"__builtins__": {}}, {})
+                    if safe_expr:
+                        tree = ast.parse(safe_expr, mode='eval')
+                        result = _eval_node(tree.body)
                         return f"Result: {result}"
                     
                     return f"Cannot calculate: {expression}"
@@ -198,30 +623,27 @@ class LangChainResearchAgent:
         
         class WorkingFileOperationsTool(BaseTool):
             name: str = "file_operations"
-            description: str = "Create research reports. Input format: 'create_report:title:content'"
+            # Braces would break the ReAct prompt template, so describe the JSON form
+            description: str = (
+                "Create research reports. Input: a JSON object with 'title' and 'content' "
+                "string fields, or the format 'create_report:title:content'"
+            )
             
             def _run(self, command: str) -> str:
                 print(f"[FILE TOOL] Executing: {command}")
                 try:
-                    if command.startswith("create_report:"):
-                        parts = command.split(":", 2)
-                        if len(parts) >= 3:
-                            title = parts[1]
-                            content = parts[2]
-                            
-                            print(f"[FILE TOOL] Creating report '{title}'")
-                            
-                            # Create reports directory using current config
-                            from config import REPORTS_DIR as current_reports_dir
-                            os.makedirs(current_reports_dir, exist_ok=True)
-                            
-                            # Generate filename
-                            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-                            filename = f"{title.replace(' ', '_')}_{timestamp}.md"
-                            filepath = os.path.join(current_reports_dir, filename)
-                            
-                            # Create report
-                            report_content = f"""# {title}
+                    parsed = _parse_report_command(command)
+                    if parsed is not None:
+                        title, content = parsed
+                        print(f"[FILE TOOL] Creating report '{title}'")
+                        
+                        # Generate filename
+                        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+                        filename = f"{title.replace(' ', '_')}_{timestamp}.md"
+                        filepath = os.path.join(config.REPORTS_DIR, filename)
+                        
+                        # Create report
+                        report_content = f"""# {title}
 
 **Generated:** {datetime.now().strftime("%Y-%m-%d %H:%M:%S")}
 
@@ -232,21 +654,28 @@ class LangChainResearchAgent:
 ---
 *Generated by LangChain Research Agent*
 """
-                            
-                            with open(filepath, 'w', encoding='utf-8') as f:
-                                f.write(report_content)
-                            
-                            # Verify file was actually created
-                            if os.path.exists(filepath):
-                                result = f"SUCCESS: Report '{title}' created at {filepath}"
-                                print(f"[FILE TOOL] {result}")
-                                return result
-                            else:
-                                error = f"FAILED: Could not create report at {filepath}"
-                                print(f"[FILE TOOL] {error}")
-                                return error
+                        
+                        # Hand the write to the background writer and wait
+                        # for it, so success is only reported for real files
+                        written = _REPORT_WRITER.submit(filepath, report_content)
+                        try:
+                            written.result(timeout=_REPORT_WRITE_TIMEOUT)
+                        except Exception as e:
+                            error = f"FAILED: Could not create report at {filepath}: {str(e) or type(e).__name__}"
+                            print(f"[FILE TOOL] {error}")
+                            return error
+                        
+                        # Verify file was actually created
+                        if not os.path.exists(filepath):
+                            error = f"FAILED: Could not create report at {filepath}"
+                            print(f"[FILE TOOL] {error}")
+                            return error
+                        
+                        result = f"SUCCESS: Report '{title}' created at {filepath}"
+                        print(f"[FILE TOOL] {result}")
+                        return result
                     
-                    return "Use format: create_report:title:content"
+                    return "Use format: create_report:title:content, or JSON with title and content"
                 except Exception as e:
                     error_msg = f"File operation error: {str(e)}"
                     print(f"[FILE TOOL] ERROR: {error_msg}")
@@ -260,46 +689,61 @@ class LangChainResearchAgent:
     
     def _get_agent_prefix(self) -> str:
         """Get the agent system prompt prefix"""
-        return """You are an intelligent AI Research Agent powered by LangChain framework. Your mission is to conduct thorough, accurate research on any topic and provide comprehensive insights.
-
-CAPABILITIES:
-- Web Search: Access current information from the internet
-- Data Analysis: Perform mathematical calculations and statistical analysis  
-- Report Generation: Create professional research reports
-- Memory: Maintain conversation context and build upon previous research
-
-RESEARCH METHODOLOGY:
-1. UNDERSTAND the user's research request thoroughly
-2. PLAN your research approach using multiple information sources
-3. SEARCH for current, reliable information using web search
-4. ANALYZE data and perform calculations when needed
-5. SYNTHESIZE findings into coherent insights
-6. GENERATE reports for comprehensive research
-
-BEST PRACTICES:
-- Always verify important facts with multiple searches
-- Use specific, targeted search queries for better results
-- Provide sources and citations when possible
-- Break complex research into manageable steps
-- Build upon previous conversation context
-- Create reports for substantial research findings
-
-Remember: You are using the LangChain framework to demonstrate professional agent development practices."""
+        return _AGENT_PREFIX
     
     def _get_agent_suffix(self) -> str:
         """Get the agent prompt suffix"""
-        return """
-Research Context:
-{research_context}
-
-Current Request: {input}
-
-Conversation History:
-{chat_history}
-
-Think step by step about how to best research this topic.
-
-{agent_scratchpad}"""
+        return _AGENT_SUFFIX
+    
+    def research_fast_path(self, query: str) -> Optional[str]:
+        """
+        Classify a query and answer it directly when the agent isn't needed
+        
+        Args:
+            query: Research question or topic
+            
+        Returns:
+            Response for empty, greeting, pure arithmetic, cached or short
+            self-contained queries, or None when the query should go through
+            the ReAct loop
+        """
+        stripped = query.strip()
+        
+        if len(stripped) < 3:
+            return _REJECT_RESPONSE
+        
+        if _GREETING_QUERY.fullmatch(stripped):
+            return _GREETING_RESPONSE
+        
+        if _ARITHMETIC_QUERY.fullmatch(stripped):
+            print(f"Calculating directly: {stripped}")
+            return self._tools_by_name["calculator"]._run(stripped)
+        
+        cached = self.response_cache.get(query)
+        if cached is not None:
+            print(f"Serving cached research: {query}")
+            return cached
+        
+        # Direct answers come from model memory rather than search, so they're
+        # not cached where they could answer near-duplicate research queries
+        if len(stripped.split()) <= _DIRECT_ANSWER_MAX_WORDS and not _NEEDS_TOOLS.search(stripped):
+            return self._answer_directly(stripped)
+        
+        return None
+    
+    def _answer_directly(self, query: str) -> Optional[str]:
+        """Answer a simple question with a single Gemini call, or None on failure"""
+        print(f"Answering directly: {query}")
+        try:
+            response = self.llm.client.models.generate_content(
+                model=self.llm.model,
+                contents=_user_contents(query),
+                config=_GEN_CFG,
+            )
+        except Exception:
+            return None
+        
+        return response.text or None
     
     def research(self, query: str) -> str:
         """
@@ -312,19 +756,33 @@ Think step by step about how to best research this topic.
             Comprehensive research response
         """
         try:
+            # Answer trivial, malformed and repeat queries without the agent
+            shortcut = self.research_fast_path(query)
+            
+            # Build the context before the query joins the conversation
+            inputs = self._agent_inputs(query)
+            
             # Add user message to memory
             self.memory.add_user_message(query)
             
+            if shortcut is not None:
+                self.memory.add_ai_message(shortcut)
+                return shortcut
+            
             # Execute research using LangChain agent
             print(f"Starting LangChain research: {query}")
             
             # Use the invoke method that we know works
-            response = self.agent_executor.invoke({"input": query})
+            response = self.agent_executor.invoke(inputs)
             result = response.get("output", str(response))
             
             # Add response to memory
             self.memory.add_ai_message(result)
             
+            # Don't cache incomplete runs or runs that wrote files
+            if _is_replayable(inputs, response):
+                self.response_cache.put(query, result)
+            
             return result
             
         except Exception as e:
@@ -332,6 +790,139 @@ Think step by step about how to best research this topic.
             self.memory.add_ai_message(error_msg)
             return error_msg
     
+    def stream(self, query: str) -> Iterator[str]:
+        """
+        Research a query, yielding the final answer as Gemini generates it
+        
+        The agent runs on a worker thread; tokens after "Final Answer:" are
+        forwarded as they arrive. Shortcut answers are yielded whole.
+        
+        Args:
+            query: Research question or topic
+            
+        Yields:
+            Chunks of the research response
+        """
+        try:
+            shortcut = self.research_fast_path(query)
+        except Exception as e:
+            shortcut = f"Research error: {str(e)}"
+        
+        # Build the context before the query joins the conversation
+        inputs = self._agent_inputs(query)
+        
+        # Add user message to memory
+        self.memory.add_user_message(query)
+        
+        if shortcut is not None:
+            self.memory.add_ai_message(shortcut)
+            yield shortcut
+            return
+        
+        print(f"Starting streaming LangChain research: {query}")
+        
+        tokens: "queue.Queue[Optional[str]]" = queue.Queue()
+        outcome = {}
+        
+        def run_agent():
+            try:
+                response = self.agent_executor.invoke(
+                    inputs,
+                    config={
+                        "callbacks": [_FinalAnswerStreamer(tokens)],
+                        "metadata": {"stream_tokens": True},
+                    },
+                )
+                result = response.get("output", str(response))
+                if _is_replayable(inputs, response):
+                    self.response_cache.put(query, result)
+            except Exception as e:
+                result = f"Research error: {str(e)}"
+            
+            # Record the answer even if the consumer stopped reading
+            self.memory.add_ai_message(result)
+            outcome["result"] = result
+            tokens.put(None)
+        
+        threading.Thread(target=run_agent, name="research-stream", daemon=True).start()
+        
+        streamed = []
+        while True:
+            token = tokens.get()
+            if token is None:
+                break
+            streamed.append(token)
+            yield token
+        
+        # Finish with the part of the stored result that wasn't streamed live
+        # (held-back text, errors, iteration limit)
+        result = outcome["result"]
+        streamed_text = "".join(streamed)
+        if result.startswith(streamed_text):
+            if len(result) > len(streamed_text):
+                yield result[len(streamed_text):]
+        else:
+            print("Streamed answer diverged from the stored research result")
+    
+    async def aresearch(self, query: str) -> str:
+        """
+        Async research method using LangChain's ainvoke
+        
+        Gemini calls and web searches are awaited instead of blocking, and
+        the executor gathers multiple tool actions from one step concurrently.
+        
+        Args:
+            query: Research question or topic
+            
+        Returns:
+            Comprehensive research response
+        """
+        result = await self._aresolve(query)
+        
+        # Add the exchange to memory
+        self.memory.add_exchanges([(query, result)])
+        
+        return result
+    
+    async def research_many(self, queries: List[str]) -> List[str]:
+        """
+        Research independent queries concurrently
+        
+        Args:
+            queries: Research questions or topics
+            
+        Returns:
+            Responses in the same order as the queries
+        """
+        results = await asyncio.gather(*(self._aresolve(query) for query in queries))
+        
+        # Record exchanges after the gather so memory stays in query order
+        self.memory.add_exchanges(list(zip(queries, results)))
+        
+        return list(results)
+    
+    async def _aresolve(self, query: str) -> str:
+        """Answer a query asynchronously without touching conversation memory"""
+        try:
+            # Cache lookups may embed the query, so keep them off the event loop
+            shortcut = await asyncio.to_thread(self.research_fast_path, query)
+            if shortcut is not None:
+                return shortcut
+            
+            print(f"Starting async LangChain research: {query}")
+            
+            inputs = self._agent_inputs(query)
+            response = await self.agent_executor.ainvoke(inputs)
+            result = response.get("output", str(response))
+            
+            if _is_replayable(inputs, response):
+                await asyncio.to_thread(self.response_cache.put, query, result)
+            
+            return result
+            
+        except Exception as e:
+            return f"Research error: {str(e)}"
+    
     def get_conversation_history(self) -> str:
         """Get formatted conversation history"""
         return self.memory.get_formatted_history()
@@ -341,8 +932,9 @@ Think step by step about how to best research this topic.
         return self.memory.get_research_context()
     
     def clear_memory(self):
-        """Clear conversation memory"""
+        """Clear conversation memory and cached responses"""
         self.memory.clear_memory()
+        self.response_cache.clear()
         print("Memory cleared!")
     
     def get_available_tools(self) -> Dict[str, str]:
@@ -355,27 +947,68 @@ Think step by step about how to best research this topic.
     
     def list_generated_files(self) -> str:
         """List files generated during research"""
+        # Include reports still waiting on the background writer
+        _REPORT_WRITER.flush()
+        
         files_info = []
         
-        # Import config values at runtime to get current values
-        from config import REPORTS_DIR as current_reports_dir, DATA_DIR as current_data_dir
-        for directory in [current_reports_dir, current_data_dir]:
-            if os.path.exists(directory):
-                files = os.listdir(directory)
-                if files:
-                    files_info.append(f"\n{directory.upper()} ({len(files)} files):")
-                    for file in sorted(files)[-5:]:  # Show last 5 files
-                        filepath = os.path.join(directory, file)
-                        size = os.path.getsize(filepath)
-                        modified = os.path.getmtime(filepath)
-                        from datetime import datetime
-                        mod_time = datetime.fromtimestamp(modified)
-                        files_info.append(f"  {file} ({size} bytes, {mod_time.strftime('%Y-%m-%d %H:%M')})")
-                else:
-                    files_info.append(f"\n{directory.upper()}: empty")
+        for directory in [config.REPORTS_DIR, config.DATA_DIR]:
+            entries = self._scan_directory(directory)
+            if entries is None:
+                continue
+            
+            if entries:
+                files_info.append(f"\n{directory.upper()} ({len(entries)} files):")
+                for name, stat in entries[-5:]:  # Show last 5 files
+                    mod_time = datetime.fromtimestamp(stat.st_mtime)
+                    files_info.append(f"  {name} ({stat.st_size} bytes, {mod_time.strftime('%Y-%m-%d %H:%M')})")
+            else:
+                files_info.append(f"\n{directory.upper()}: empty")
         
         return "\n".join(files_info) if files_info else "No files generated yet"
     
+    def list_generated_files_structured(self, limit: int = 5) -> List[Dict[str, Any]]:
+        """
+        List recently generated files as structured records
+        
+        Args:
+            limit: Number of most recent files to include per directory
+            
+        Returns:
+            List of dicts with name, size, mtime and dir for each file
+        """
+        # Include reports still waiting on the background writer
+        _REPORT_WRITER.flush()
+        
+        files = []
+        for directory in [config.REPORTS_DIR, config.DATA_DIR]:
+            for name, stat in (self._scan_directory(directory) or [])[-limit:]:
+                files.append({
+                    "name": name,
+                    "size": stat.st_size,
+                    "mtime": stat.st_mtime,
+                    "dir": directory
+                })
+        
+        return files
+    
+    @staticmethod
+    def _scan_directory(directory: str) -> Optional[List[tuple]]:
+        """
+        Return (name, stat) pairs for a directory, oldest first
+        
+        Uses scandir so each entry costs a single stat call. Returns None if
+        the directory does not exist.
+        """
+        try:
+            with os.scandir(directory) as it:
+                entries = [(entry.name, entry.stat()) for entry in it]
+        except FileNotFoundError:
+            return None
+        
+        entries.sort(key=lambda item: item[1].st_mtime)
+        return entries
+    
     def update_session_summary(self, summary: str):
         """Update the session summary with key findings"""
         self.memory.update_session_summary(summary)
@@ -389,6 +1022,10 @@ Think step by step about how to best research this topic.
             "max_iterations": MAX_ITERATIONS,
             "tools_count": len(self.tools),
             "tools": [tool.name for tool in self.tools],
-            "memory_type": "ConversationBufferWindowMemory",
+            "memory_type": (
+                "ConversationBufferWindowMemory with background summarization"
+                if self.session_context else "ConversationBufferWindowMemory"
+            ),
+            "session_context": self.session_context,
             "verbose": VERBOSE
         }
\ No newline at end of file
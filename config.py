@@ -12,12 +12,38 @@ GEMINI_MODEL = "gemini-2.5-flash"
 
 # Agent Configuration
 MAX_ITERATIONS = 10
+
+# Wall-clock limit in seconds for one research run; also bounds each Gemini
+# request, so shortcut answers can't outlast an agent run
+AGENT_MAX_EXECUTION_TIME = 300
 VERBOSE = True
 
+# Number of research tasks processed concurrently by the API
+TASK_WORKERS = 8
+
+# Task retention: finished tasks expire after the TTL, and the oldest
+# finished tasks are evicted once more than MAX_TASKS are stored
+TASK_TTL_SECONDS = 3600
+TASK_SWEEP_INTERVAL = 60
+MAX_TASKS = 10_000
+
+# SQLite file backing task storage; set to an empty string to keep tasks
+# in memory only (tasks are then lost on restart and not shared by workers)
+TASK_DB_PATH = os.getenv("TASK_DB_PATH", "tasks.db")
+
 # Memory Configuration
 CONVERSATION_MEMORY_KEY = "chat_history"
 MAX_TOKEN_LIMIT = 2000
 
+# Cheaper model used to fold old conversation turns into the session summary
+SUMMARY_MODEL = "gemini-2.5-flash-lite"
+
 # Output directories
 REPORTS_DIR = "reports"
 DATA_DIR = "data"
+
+# Response cache configuration
+RESPONSE_CACHE_SIZE = 256
+SEMANTIC_CACHE_THRESHOLD = 0.92
+RESPONSE_CACHE_TTL_SECONDS = 6 * 3600
+EMBEDDING_MODEL = "text-embedding-004"
@@ -3,18 +3,24 @@ FastAPI Application with Background Tasks
 Simple implementation without external message queues
 """
 
-from fastapi import FastAPI, BackgroundTasks, HTTPException
+from fastapi import FastAPI, HTTPException, Header, Query, Response
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel, Field
-from typing import Optional, Dict, Any, List
+from fastapi.responses import ORJSONResponse, StreamingResponse
+from pydantic import BaseModel, Field, StringConstraints
+from typing import Optional, Dict, List, Annotated
+import orjson
 import uuid
 import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 import os
 import sys
 
 # Import our research agent
 from agents.research_agent import LangChainResearchAgent
+from config import TASK_WORKERS, TASK_TTL_SECONDS, TASK_SWEEP_INTERVAL, MAX_TASKS, TASK_DB_PATH
+from tasks import TaskStore, SQLiteTaskStore, TERMINAL_STATUSES, format_timestamp
 
 # Initialize FastAPI app
 app = FastAPI(
@@ -22,7 +28,8 @@ app = FastAPI(
     description="AI Research Assistant with Background Task Processing",
     version="1.0.0",
     docs_url="/docs",
-    redoc_url="/redoc"
+    redoc_url="/redoc",
+    default_response_class=ORJSONResponse
 )
 
 # Add CORS middleware
@@ -34,8 +41,85 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# In-memory storage for task results
-task_storage: Dict[str, Dict[str, Any]] = {}
+# Storage for task results, shared with the worker pool threads
+if TASK_DB_PATH:
+    # Unfinished tasks of a worker that misses three sweeps are failed
+    task_store = SQLiteTaskStore(TASK_DB_PATH, max_tasks=MAX_TASKS, stale_after=3 * TASK_SWEEP_INTERVAL)
+else:
+    task_store = TaskStore(max_tasks=MAX_TASKS)
+
+# One event per task with async waiters, replaced each time it fires
+task_waiters: Dict[str, asyncio.Event] = {}
+
+# Bound on how long a waiter sleeps before re-reading the store, which also
+# covers changes made by other workers sharing the SQLite store
+TASK_WAIT_RECHECK = 1.0
+
+# Largest number of queries accepted by POST /research/batch
+MAX_BATCH_QUERIES = 50
+
+# Longest long-poll accepted by GET /research/{task_id}/status?wait=
+MAX_STATUS_WAIT = 60
+
+
+def notify_task_changed(task_id: str):
+    """Wake async waiters for a task; safe to call from worker threads"""
+    loop = getattr(app.state, "loop", None)
+    if loop is not None and task_id in task_waiters:
+        loop.call_soon_threadsafe(_wake_task_waiters, task_id)
+
+
+def _wake_task_waiters(task_id: str):
+    event = task_waiters.pop(task_id, None)
+    if event is not None:
+        event.set()
+
+
+task_store.on_change = notify_task_changed
+
+
+async def store_call(method, *args, **kwargs):
+    """Call a task store method from async code without blocking the loop on disk I/O"""
+    if task_store.blocking:
+        return await asyncio.to_thread(method, *args, **kwargs)
+    return method(*args, **kwargs)
+
+
+async def read_task_state(task_id: str) -> Optional[tuple]:
+    """Return a task's (status, progress), or None if it doesn't exist"""
+    task_data = await store_call(task_store.get, task_id)
+    if task_data is None:
+        return None
+    return task_data["status"], task_data.get("progress", 0)
+
+
+async def wait_for_task_change(task_id: str, last_state: tuple, timeout: float = TASK_WAIT_RECHECK) -> Optional[tuple]:
+    """
+    Wait until a task's (status, progress) differs from last_state
+    
+    Returns:
+        The task's state once it changes or the timeout elapses
+    """
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + timeout
+    
+    while True:
+        # Re-read after registering so a change in between isn't missed
+        event = task_waiters.setdefault(task_id, asyncio.Event())
+        state = await read_task_state(task_id)
+        remaining = deadline - loop.time()
+        if state != last_state or remaining <= 0:
+            return state
+        
+        try:
+            await asyncio.wait_for(event.wait(), min(remaining, TASK_WAIT_RECHECK))
+        except asyncio.TimeoutError:
+            pass
+
+
+def status_etag(status: str, progress: int) -> str:
+    """ETag for a task's status representation"""
+    return f'"{status}-{progress}"'
 
 
 # Pydantic models
@@ -59,6 +143,20 @@ class ResearchRequest(BaseModel):
     )
 
 
+# A single batch query, with the same length limits as ResearchRequest.query
+BatchQuery = Annotated[str, StringConstraints(min_length=3, max_length=1000)]
+
+
+class BatchResearchRequest(BaseModel):
+    queries: List[BatchQuery] = Field(
+        ...,
+        description="Research queries or questions",
+        min_length=1,
+        max_length=MAX_BATCH_QUERIES,
+        example=["What is machine learning?", "Explain quantum computing"]
+    )
+
+
 class ResearchResponse(BaseModel):
     task_id: str
     status: str
@@ -66,6 +164,13 @@ class ResearchResponse(BaseModel):
     estimated_time: Optional[str] = None
 
 
+class BatchResearchResponse(BaseModel):
+    batch_id: str
+    task_ids: List[str]
+    status: str
+    message: str
+
+
 class TaskStatus(BaseModel):
     task_id: str
     status: str
@@ -75,6 +180,13 @@ class TaskStatus(BaseModel):
     progress: int
 
 
+class GeneratedFile(BaseModel):
+    name: str
+    size: int
+    mtime: float
+    dir: str
+
+
 class TaskResult(BaseModel):
     task_id: str
     status: str
@@ -83,13 +195,27 @@ class TaskResult(BaseModel):
     error: Optional[str] = None
     created_at: str
     completed_at: Optional[str] = None
-    files_generated: Optional[List[str]] = None
+    files_generated: Optional[List[GeneratedFile]] = None
+
+
+def finish_task(task_id: str, **fields) -> Optional[Dict]:
+    """
+    Record a task's final state
+    
+    Returns:
+        The updated task record, or None if the task was removed meanwhile
+    """
+    try:
+        return task_store.update(task_id, completed_at_ns=time.time_ns(), progress=100, **fields)
+    except KeyError:
+        print(f"Research task {task_id} was removed before it finished")
+        return None
 
 
 # Background task function
 def process_research_task(task_id: str, query: str, max_iterations: int = 10, create_report: bool = False):
     """
-    Background task to process research requests
+    Background task to process research requests, run on the worker pool
     
     Args:
         task_id: Unique task identifier
@@ -98,57 +224,135 @@ def process_research_task(task_id: str, query: str, max_iterations: int = 10, cr
         create_report: Whether to create a report
     """
     try:
-        print(f"Starting research task {task_id}: {query[:50]}...")
+        # Update task status to processing, unless it was cancelled while queued
+        if not task_store.transition(task_id, ("queued",), status="processing", progress=25):
+            print(f"Research task {task_id} was cancelled before starting")
+            return
         
-        # Update task status to processing
-        task_storage[task_id]["status"] = "processing"
-        task_storage[task_id]["progress"] = 25
+        print(f"Starting research task {task_id}: {query[:50]}...")
         
-        # Initialize research agent
-        agent = LangChainResearchAgent()
+        # Reuse the agent created at startup
+        agent = app.state.agent
         
         # Update progress
-        task_storage[task_id]["progress"] = 50
+        task_store.update(task_id, progress=50)
         
         # Conduct research
         result = agent.research(query)
         
         # Update progress
-        task_storage[task_id]["progress"] = 75
+        task_store.update(task_id, progress=75)
         
         # Get generated files if any
-        files_generated = []
         try:
-            files_info = agent.list_generated_files()
-            if files_info and files_info != "No files generated yet":
-                files_generated = [line.strip() for line in files_info.split('\n') if line.strip() and not line.startswith('REPORTS') and not line.startswith('DATA')]
-        except:
+            files_generated = agent.list_generated_files_structured()
+        except OSError:
             files_generated = []
         
         # Update task with results
-        task_storage[task_id].update({
-            "status": "completed",
-            "result": result,
-            "completed_at": datetime.now().isoformat(),
-            "files_generated": files_generated,
-            "progress": 100
-        })
-        
-        print(f"Research task {task_id} completed successfully")
+        if finish_task(task_id, status="completed", result=result, files_generated=files_generated):
+            print(f"Research task {task_id} completed successfully")
         
     except Exception as e:
         # Update task with error
         error_msg = str(e)
-        task_storage[task_id].update({
-            "status": "failed",
-            "error": error_msg,
-            "completed_at": datetime.now().isoformat(),
-            "progress": 100
-        })
+        finish_task(task_id, status="failed", error=error_msg)
         
         print(f"Research task {task_id} failed: {error_msg}")
 
 
+async def process_research_batch(task_ids: List[str], queries: List[str]):
+    """
+    Background coroutine running a batch's tasks together on the async agent path
+    
+    Files are listed once, after the whole batch finishes, so every task's
+    files_generated shows the most recent reports, including ones written
+    for other queries in the batch.
+    
+    Args:
+        task_ids: Queued task identifiers, one per query
+        queries: Research queries in batch order
+    """
+    # Skip tasks cancelled while queued
+    started = []
+    for task_id, query in zip(task_ids, queries):
+        if await store_call(task_store.transition, task_id, ("queued",), status="processing", progress=50):
+            started.append((task_id, query))
+    if not started:
+        return
+    
+    try:
+        agent = app.state.agent
+        results = await agent.research_many([query for _, query in started])
+        
+        try:
+            files_generated = await asyncio.to_thread(agent.list_generated_files_structured)
+        except OSError:
+            files_generated = []
+        
+        for (task_id, _), result in zip(started, results):
+            await store_call(
+                finish_task, task_id, status="completed", result=result, files_generated=files_generated
+            )
+        
+        print(f"Research batch of {len(started)} tasks completed successfully")
+        
+    except Exception as e:
+        error_msg = str(e)
+        for task_id, _ in started:
+            await store_call(finish_task, task_id, status="failed", error=error_msg)
+        
+        print(f"Research batch of {len(started)} tasks failed: {error_msg}")
+
+
+async def record_queued_task(query: str) -> str:
+    """
+    Record a new research task in the queued state
+    
+    Returns:
+        The new task's ID
+    """
+    task_id = str(uuid.uuid4())
+    
+    await store_call(task_store.add, {
+        "task_id": task_id,
+        "status": "queued",
+        "query": query,
+        "created_at_ns": time.time_ns(),
+        "result": None,
+        "error": None,
+        "progress": 0,
+        "files_generated": []
+    })
+    
+    print(f"Research task {task_id} queued: {query[:50]}...")
+    return task_id
+
+
+async def enqueue_research_task(query: str, max_iterations: int = 10, create_report: bool = False) -> str:
+    """
+    Record a queued research task and hand it to the worker pool
+    
+    Returns:
+        The new task's ID
+    """
+    task_id = await record_queued_task(query)
+    app.state.pool.submit(process_research_task, task_id, query, max_iterations, create_report)
+    return task_id
+
+
+async def evict_expired_tasks():
+    """Periodically drop finished tasks older than the retention TTL"""
+    while True:
+        await asyncio.sleep(TASK_SWEEP_INTERVAL)
+        evicted = await store_call(task_store.evict_expired, TASK_TTL_SECONDS)
+        if evicted:
+            print(f"Evicted {evicted} expired research tasks")
+        interrupted = await store_call(task_store.recover_interrupted)
+        if interrupted:
+            print(f"Marked {interrupted} interrupted research tasks as failed")
+
+
 # API Endpoints
 @app.get("/")
 async def root():
@@ -159,7 +363,11 @@ async def root():
         "framework": "FastAPI with Background Tasks",
         "endpoints": {
             "research": "/research",
+            "research_batch": "/research/batch",
+            "research_sync": "/research/sync",
+            "research_stream": "/research/stream",
             "status": "/research/{task_id}/status",
+            "events": "/research/{task_id}/events",
             "results": "/research/{task_id}",
             "list": "/research",
             "health": "/health",
@@ -174,49 +382,24 @@ async def health_check():
     return {
         "status": "healthy",
         "timestamp": datetime.now().isoformat(),
-        "active_tasks": len([t for t in task_storage.values() if t["status"] == "processing"]),
-        "total_tasks": len(task_storage)
+        "active_tasks": await store_call(task_store.count, "processing"),
+        "total_tasks": await store_call(len, task_store)
     }
 
 
 @app.post("/research", response_model=ResearchResponse)
-async def submit_research_request(request: ResearchRequest, background_tasks: BackgroundTasks):
+async def submit_research_request(request: ResearchRequest):
     """
     Submit a research request for background processing
     
     Args:
         request: Research request with query and parameters
-        background_tasks: FastAPI background tasks
         
     Returns:
         ResearchResponse with task_id and status
     """
     try:
-        # Generate unique task ID
-        task_id = str(uuid.uuid4())
-        
-        # Initialize task status
-        task_storage[task_id] = {
-            "task_id": task_id,
-            "status": "queued",
-            "query": request.query,
-            "created_at": datetime.now().isoformat(),
-            "result": None,
-            "error": None,
-            "progress": 0,
-            "files_generated": []
-        }
-        
-        # Add background task
-        background_tasks.add_task(
-            process_research_task,
-            task_id,
-            request.query,
-            request.max_iterations,
-            request.create_report
-        )
-        
-        print(f"Research task {task_id} queued: {request.query[:50]}...")
+        task_id = await enqueue_research_task(request.query, request.max_iterations, request.create_report)
         
         return ResearchResponse(
             task_id=task_id,
@@ -229,28 +412,193 @@ async def submit_research_request(request: ResearchRequest, background_tasks: Ba
         raise HTTPException(status_code=500, detail=f"Failed to submit research request: {str(e)}")
 
 
+@app.post("/research/batch", response_model=BatchResearchResponse)
+async def submit_research_batch(request: BatchResearchRequest):
+    """
+    Submit several research requests for background processing in one call
+    
+    The batch runs as one job on the async agent path, so its queries
+    overlap their Gemini round-trips without taking a worker thread each.
+    
+    Args:
+        request: Batch request with the queries to research
+        
+    Returns:
+        BatchResearchResponse with a batch_id and one task_id per query
+    """
+    try:
+        batch_id = str(uuid.uuid4())
+        task_ids = [await record_queued_task(query) for query in request.queries]
+        
+        # Keep a reference so the job isn't garbage collected while it runs
+        job = asyncio.create_task(process_research_batch(task_ids, request.queries))
+        app.state.batches.add(job)
+        job.add_done_callback(app.state.batches.discard)
+        
+        print(f"Research batch {batch_id} queued: {len(task_ids)} tasks")
+        
+        return BatchResearchResponse(
+            batch_id=batch_id,
+            task_ids=task_ids,
+            status="queued",
+            message=f"{len(task_ids)} research requests submitted successfully"
+        )
+        
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to submit research batch: {str(e)}")
+
+
+@app.post("/research/sync", response_model=TaskResult)
+async def run_research_sync(request: ResearchRequest):
+    """
+    Run a research request and wait for its result
+    
+    Uses the async agent path, so the event loop stays free while Gemini
+    responds. Long queries should use POST /research instead.
+    
+    Args:
+        request: Research request with query and parameters
+        
+    Returns:
+        TaskResult with the research result
+    """
+    task_id = str(uuid.uuid4())
+    
+    await store_call(task_store.add, {
+        "task_id": task_id,
+        "status": "processing",
+        "query": request.query,
+        "created_at_ns": time.time_ns(),
+        "result": None,
+        "error": None,
+        "progress": 50,
+        "files_generated": []
+    })
+    
+    try:
+        result = await app.state.agent.aresearch(request.query)
+        updates = {"status": "completed", "result": result}
+    except Exception as e:
+        updates = {"status": "failed", "error": str(e)}
+    
+    task_data = await store_call(finish_task, task_id, **updates)
+    if task_data is None:
+        raise HTTPException(status_code=404, detail="Task not found")
+    
+    return TaskResult(
+        task_id=task_id,
+        status=task_data["status"],
+        query=task_data["query"],
+        result=task_data.get("result"),
+        error=task_data.get("error"),
+        created_at=format_timestamp(task_data["created_at_ns"]),
+        completed_at=format_timestamp(task_data.get("completed_at_ns")),
+        files_generated=task_data.get("files_generated", [])
+    )
+
+
+@app.post("/research/stream")
+async def stream_research(request: ResearchRequest):
+    """
+    Run a research request, streaming the answer as it is generated
+    
+    The response body is plain text; chunks are written as Gemini produces
+    the agent's final answer, so clients see output before the run finishes.
+    
+    Args:
+        request: Research request with query and parameters
+        
+    Returns:
+        StreamingResponse with the research answer
+    """
+    return StreamingResponse(
+        app.state.agent.stream(request.query),
+        media_type="text/plain; charset=utf-8"
+    )
+
+
+@app.get("/research/{task_id}/events")
+async def stream_task_events(task_id: str):
+    """
+    Stream task status changes as server-sent events
+    
+    Emits a "status" event whenever the status or progress changes and
+    closes the stream once the task finishes, so clients don't need to poll.
+    
+    Args:
+        task_id: Unique task identifier
+    """
+    if await store_call(task_store.get, task_id) is None:
+        raise HTTPException(status_code=404, detail="Task not found")
+    
+    async def event_stream():
+        last_state = None
+        state = await read_task_state(task_id)
+        while state is not None:
+            if state != last_state:
+                last_state = state
+                payload = orjson.dumps({
+                    "task_id": task_id,
+                    "status": state[0],
+                    "progress": state[1]
+                })
+                yield b"event: status\ndata: " + payload + b"\n\n"
+            
+            if state[0] in TERMINAL_STATUSES:
+                return
+            
+            state = await wait_for_task_change(task_id, last_state)
+    
+    return StreamingResponse(event_stream(), media_type="text/event-stream")
+
+
 @app.get("/research/{task_id}/status", response_model=TaskStatus)
-async def get_task_status(task_id: str):
+async def get_task_status(
+    task_id: str,
+    response: Response,
+    wait: float = Query(0, ge=0, le=MAX_STATUS_WAIT, description="Seconds to wait for a status change"),
+    if_none_match: Optional[str] = Header(None)
+):
     """
     Get the status of a research task
     
+    Responses carry an ETag; a matching If-None-Match gets 304 Not Modified.
+    With ?wait=N the request long-polls for up to N seconds until the
+    status or progress changes from the one the client already has (or
+    from the current one when no ETag is sent).
+    
     Args:
         task_id: Unique task identifier
+        wait: Seconds to wait for a status change before responding
+        if_none_match: ETag of the status the client already has
         
     Returns:
         TaskStatus with current status and metadata
     """
-    if task_id not in task_storage:
+    task_data = await store_call(task_store.get, task_id)
+    if task_data is None:
         raise HTTPException(status_code=404, detail="Task not found")
     
-    task_data = task_storage[task_id]
+    state = (task_data["status"], task_data.get("progress", 0))
+    etag = status_etag(*state)
     
+    if wait and state[0] not in TERMINAL_STATUSES and if_none_match in (None, etag):
+        await wait_for_task_change(task_id, state, timeout=wait)
+        task_data = await store_call(task_store.get, task_id)
+        if task_data is None:
+            raise HTTPException(status_code=404, detail="Task not found")
+        etag = status_etag(task_data["status"], task_data.get("progress", 0))
+    
+    if if_none_match == etag:
+        return Response(status_code=304, headers={"ETag": etag})
+    
+    response.headers["ETag"] = etag
     return TaskStatus(
         task_id=task_id,
         status=task_data["status"],
         query=task_data["query"],
-        created_at=task_data["created_at"],
-        completed_at=task_data.get("completed_at"),
+        created_at=format_timestamp(task_data["created_at_ns"]),
+        completed_at=format_timestamp(task_data.get("completed_at_ns")),
         progress=task_data.get("progress", 0)
     )
 
@@ -266,90 +614,141 @@ async def get_research_results(task_id: str):
     Returns:
         TaskResult with research results or current status
     """
-    if task_id not in task_storage:
+    task_data = await store_call(task_store.get, task_id)
+    if task_data is None:
         raise HTTPException(status_code=404, detail="Task not found")
     
-    task_data = task_storage[task_id]
-    
     return TaskResult(
         task_id=task_id,
         status=task_data["status"],
         query=task_data["query"],
         result=task_data.get("result"),
         error=task_data.get("error"),
-        created_at=task_data["created_at"],
-        completed_at=task_data.get("completed_at"),
+        created_at=format_timestamp(task_data["created_at_ns"]),
+        completed_at=format_timestamp(task_data.get("completed_at_ns")),
         files_generated=task_data.get("files_generated", [])
     )
 
 
 @app.get("/research")
-async def list_research_tasks():
-    """List all research tasks with their current status"""
-    tasks = []
-    for task_data in task_storage.values():
-        tasks.append({
-            "task_id": task_data["task_id"],
-            "status": task_data["status"],
-            "query": task_data["query"][:100] + "..." if len(task_data["query"]) > 100 else task_data["query"],
-            "created_at": task_data["created_at"],
-            "progress": task_data.get("progress", 0)
-        })
-    
-    return {
-        "total_tasks": len(tasks),
-        "tasks": sorted(tasks, key=lambda x: x["created_at"], reverse=True)
-    }
+async def list_research_tasks(
+    limit: Optional[int] = Query(None, ge=1, description="Maximum number of tasks to return")
+):
+    """List research tasks, most recent first, with their current status"""
+    # Summaries are precomputed by the store, so serialize them directly
+    return ORJSONResponse({
+        "total_tasks": await store_call(len, task_store),
+        "tasks": await store_call(task_store.recent_summaries, limit)
+    })
 
 
 @app.delete("/research/{task_id}")
 async def cancel_research_task(task_id: str):
     """Cancel a research task (if still queued)"""
-    if task_id not in task_storage:
+    task_data = await store_call(task_store.get, task_id)
+    if task_data is None:
         raise HTTPException(status_code=404, detail="Task not found")
     
-    task_data = task_storage[task_id]
-    
     if task_data["status"] in ["completed", "failed"]:
         raise HTTPException(status_code=400, detail="Cannot cancel completed or failed task")
     
-    if task_data["status"] == "queued":
-        task_storage[task_id]["status"] = "cancelled"
-        task_storage[task_id]["completed_at"] = datetime.now().isoformat()
-        task_storage[task_id]["progress"] = 100
+    cancelled = await store_call(
+        task_store.transition,
+        task_id,
+        ("queued",),
+        status="cancelled",
+        completed_at_ns=time.time_ns(),
+        progress=100
+    )
+    if cancelled:
         return {"message": "Task cancelled successfully"}
-    else:
-        raise HTTPException(status_code=400, detail="Cannot cancel task in progress")
+    
+    raise HTTPException(status_code=400, detail="Cannot cancel task in progress")
 
 
 # Startup event
+# Printed once the app is ready; built at import so startup issues one write
+STARTUP_BANNER = """FastAPI Research Agent API started successfully!
+Available endpoints:
+  POST /research - Submit research request
+  POST /research/batch - Submit several research requests at once
+  POST /research/sync - Run research and wait for the result
+  POST /research/stream - Run research and stream the answer
+  GET /research/{task_id} - Get research results
+  GET /research/{task_id}/status - Get task status
+  GET /research/{task_id}/events - Stream task status events
+  GET /research - List all tasks
+  GET /health - Health check
+  GET /docs - API documentation
+Server running at: http://localhost:8000
+API Documentation: http://localhost:8000/docs
+"""
+
+
 @app.on_event("startup")
 async def startup_event():
     """Initialize application on startup"""
-    print("FastAPI Research Agent API started successfully!")
-    print("Available endpoints:")
-    print("  POST /research - Submit research request")
-    print("  GET /research/{task_id} - Get research results")
-    print("  GET /research/{task_id}/status - Get task status")
-    print("  GET /research - List all tasks")
-    print("  GET /health - Health check")
-    print("  GET /docs - API documentation")
-    print(f"Server running at: http://localhost:8000")
-    print(f"API Documentation: http://localhost:8000/docs")
+    # Worker threads hand change notifications to this loop
+    app.state.loop = asyncio.get_running_loop()
+    
+    # Build the research agent once and share it across all tasks; construct
+    # it on a thread so the pool, store maintenance and sweeper below are
+    # set up while it initializes
+    agent_ready = asyncio.ensure_future(asyncio.to_thread(LangChainResearchAgent))
+    
+    # Worker pool so research tasks overlap their Gemini round-trips
+    app.state.pool = ThreadPoolExecutor(max_workers=TASK_WORKERS, thread_name_prefix="research")
+    
+    # Batch jobs running on the event loop
+    app.state.batches = set()
+    
+    # Fail tasks left unfinished by a previous run of the server, and drop
+    # the ones that expired while it was down
+    interrupted = await store_call(task_store.recover_interrupted)
+    if interrupted:
+        print(f"Marked {interrupted} interrupted research tasks as failed")
+    evicted = await store_call(task_store.evict_expired, TASK_TTL_SECONDS)
+    if evicted:
+        print(f"Evicted {evicted} expired research tasks")
+    
+    # Expire finished tasks so task storage doesn't grow without bound
+    app.state.sweeper = asyncio.create_task(evict_expired_tasks())
+    
+    # Startup fails here if agent construction raised
+    app.state.agent = await agent_ready
+    
+    sys.stdout.write(STARTUP_BANNER)
+    sys.stdout.flush()
 
 
 @app.on_event("shutdown")
 async def shutdown_event():
     """Clean up on shutdown"""
+    app.state.sweeper.cancel()
+    app.state.pool.shutdown(wait=False, cancel_futures=True)
+    for job in app.state.batches:
+        job.cancel()
+    await store_call(task_store.release)
     print("FastAPI Research Agent API shutdown complete")
 
 
 if __name__ == "__main__":
     import uvicorn
+    
+    # Auto-reload only for local development; it costs throughput in production
+    dev_mode = bool(os.getenv("DEV"))
+    
     uvicorn.run(
-        "fastapi_app:app",
+        "main:app",
         host="0.0.0.0",
-        port=8080,
-        reload=True,
-        log_level="info"
+        port=8000,
+        # uvloop and httptools when installed (uvicorn[standard], not on
+        # Windows), falling back to asyncio and h11 otherwise
+        loop="auto",
+        http="auto",
+        # Several workers need the SQLite task store (TASK_DB_PATH) to share tasks
+        workers=1 if dev_mode else int(os.getenv("WEB_CONCURRENCY", "1")),
+        reload=dev_mode,
+        access_log=not os.getenv("DISABLE_ACCESS_LOG"),
+        log_level="info" if dev_mode else "warning"
     )
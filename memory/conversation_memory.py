@@ -6,21 +6,61 @@ from langchain.memory import ConversationBufferWindowMemory
 from langchain.schema import BaseMessage
 from langchain.schema.messages import HumanMessage, AIMessage
 from config import CONVERSATION_MEMORY_KEY, MAX_TOKEN_LIMIT
-from typing import List, Dict, Any
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Any, Optional, Callable
+import re
+import threading
+
+
+# Research keyword as a whole word, capturing the up-to-three words after it
+_KW_RE = re.compile(
+    r'(?<!\S)(research|analyze|study|investigate|examine|explore|report|trends|statistics|data)'
+    r'(?=\s+(\S+(?:\s+\S+){0,2}))',
+    re.IGNORECASE
+)
+_TOPIC_STRIP = str.maketrans("", "", "?.")
+
+# Display roles by exact message class; other types fall back to their type name
+_ROLE_MAP = {HumanMessage: "Human", AIMessage: "Assistant"}
+
+# Number of recent research topics to keep
+_MAX_TOPICS = 10
+
+# Number of recent messages included in the research context
+_CONTEXT_MESSAGES = 4
+
+# Minimum number of messages outside the window before they are summarized
+_SUMMARY_BATCH = 4
+
+
+def _truncate(content: str, limit: int) -> str:
+    """Shorten content to limit characters for display, marking the cut"""
+    return content if len(content) <= limit else f"{content[:limit]}..."
 
 
 class ResearchAgentMemory:
     """
     Enhanced conversation memory for the research agent using LangChain.
     Maintains context and conversation history for better research continuity.
+    Writes are locked, since one agent instance serves concurrent API tasks.
+    Turns that slide out of the window are folded into the session summary
+    on a background thread when a summarizer is given, and dropped otherwise.
     """
     
-    def __init__(self, k: int = 10):
+    def __init__(
+        self,
+        k: int = 10,
+        summarize_fn: Optional[Callable[[str, List[BaseMessage]], str]] = None
+    ):
         """
         Initialize conversation memory
         
         Args:
             k: Number of recent conversation turns to remember
+            summarize_fn: Function taking the current summary and old messages
+                and returning an updated summary, or None to drop messages
+                once they leave the window
         """
         self.memory = ConversationBufferWindowMemory(
             k=k,
@@ -29,20 +69,83 @@ class ResearchAgentMemory:
             max_token_limit=MAX_TOKEN_LIMIT
         )
         
-        # Track research topics for context
-        self.research_topics = []
+        # Track research topics for context; the set mirrors the deque for lookups
+        self.research_topics = deque(maxlen=_MAX_TOPICS)
+        self._topics_set = set()
         self.session_summary = ""
+        
+        # Display lines built once per message: the full history, and a
+        # mirror of the latest messages for the research context
+        self._history_lines: List[str] = []
+        self._recent_lines = deque(maxlen=_CONTEXT_MESSAGES)
+        
+        # Running message counts and memoized display history
+        self._human_count = 0
+        self._ai_count = 0
+        self._formatted_cache: Optional[str] = None
+        
+        # Background summarization of messages older than the window
+        self.summarize_fn = summarize_fn
+        self._summary_pool = (
+            ThreadPoolExecutor(max_workers=1, thread_name_prefix="memory-summary")
+            if summarize_fn is not None else None
+        )
+        self._summarizing = False
+        self._generation = 0
+        
+        self._lock = threading.RLock()
     
     def add_user_message(self, message: str):
         """Add a user message to memory"""
-        self.memory.chat_memory.add_user_message(message)
-        
-        # Extract potential research topics
-        self._extract_research_topics(message)
+        with self._lock:
+            self.memory.chat_memory.add_user_message(message)
+            self._record_display(self.memory.chat_memory.messages[-1])
+            self._human_count += 1
+            self._formatted_cache = None
+            
+            # Extract potential research topics
+            self._extract_research_topics(message)
     
     def add_ai_message(self, message: str):
         """Add an AI response to memory"""
-        self.memory.chat_memory.add_ai_message(message)
+        with self._lock:
+            self.memory.chat_memory.add_ai_message(message)
+            self._record_display(self.memory.chat_memory.messages[-1])
+            self._ai_count += 1
+            self._formatted_cache = None
+            
+            self._schedule_summary()
+    
+    def add_exchanges(self, exchanges: List[tuple]):
+        """
+        Add several (user message, AI response) pairs in one update
+        
+        Args:
+            exchanges: Pairs of user message and AI response, oldest first
+        """
+        messages = []
+        for user_message, ai_message in exchanges:
+            messages.append(HumanMessage(content=user_message))
+            messages.append(AIMessage(content=ai_message))
+        
+        with self._lock:
+            self.memory.chat_memory.add_messages(messages)
+            for message in messages:
+                self._record_display(message)
+            self._human_count += len(exchanges)
+            self._ai_count += len(exchanges)
+            self._formatted_cache = None
+            
+            for user_message, _ in exchanges:
+                self._extract_research_topics(user_message)
+            
+            self._schedule_summary()
+    
+    def _record_display(self, message: BaseMessage):
+        """Precompute the truncated display lines for a new message"""
+        role = _ROLE_MAP.get(type(message)) or message.type.title()
+        self._history_lines.append(f"{role}: {_truncate(message.content, 200)}")
+        self._recent_lines.append(f"- {role}: {_truncate(message.content, 100)}")
     
     def get_conversation_history(self) -> List[BaseMessage]:
         """Get the current conversation history"""
@@ -53,104 +156,151 @@ class ResearchAgentMemory:
         memory_vars = self.memory.load_memory_variables({})
         
         # Add research context
-        memory_vars["research_topics"] = self.research_topics
+        memory_vars["research_topics"] = list(self.research_topics)
         memory_vars["session_summary"] = self.session_summary
         
         return memory_vars
     
     def get_formatted_history(self) -> str:
         """Get conversation history formatted for display"""
-        messages = self.get_conversation_history()
-        if not messages:
+        with self._lock:
+            if self._formatted_cache is None:
+                self._formatted_cache = self._format_history()
+            return self._formatted_cache
+    
+    def _format_history(self) -> str:
+        """Build the display history from scratch"""
+        if not self._history_lines:
             return "No conversation history yet."
         
-        formatted = "Conversation History:\n" + "="*50 + "\n"
-        
-        for i, message in enumerate(messages, 1):
-            if isinstance(message, HumanMessage):
-                role = "Human"
-                content = message.content
-            elif isinstance(message, AIMessage):
-                role = "Assistant"
-                content = message.content
-            else:
-                role = f"{message.type.title()}"
-                content = message.content
-            
-            # Truncate long messages for display
-            display_content = content[:200] + "..." if len(content) > 200 else content
-            formatted += f"{i}. {role}: {display_content}\n\n"
+        parts = ["Conversation History:\n", "="*50, "\n"]
         
-        return formatted
+        for i, line in enumerate(self._history_lines, 1):
+            parts.append(f"{i}. {line}\n\n")
+        
+        return "".join(parts)
     
-    def get_research_context(self) -> str:
-        """Get research context for the agent"""
-        context_parts = []
+    def get_research_context(self, empty: str = "No previous context.") -> str:
+        """
+        Get research context for the agent
         
-        # Recent conversation context
-        recent_messages = self.get_conversation_history()[-4:]  # Last 4 messages
-        if recent_messages:
-            context_parts.append("Recent conversation:")
-            for msg in recent_messages:
-                role = "Human" if isinstance(msg, HumanMessage) else "Assistant"
-                content = msg.content[:100] + "..." if len(msg.content) > 100 else msg.content
-                context_parts.append(f"- {role}: {content}")
+        Sections run from least to most frequently changing (summary, topics,
+        recent turns), so consecutive prompts share the longest possible prefix.
         
-        # Research topics context
-        if self.research_topics:
-            context_parts.append(f"\nOngoing research topics: {', '.join(self.research_topics[-5:])}")
+        Args:
+            empty: Returned when there is no context yet
+        """
+        sections = []
         
         # Session summary
         if self.session_summary:
-            context_parts.append(f"\nSession summary: {self.session_summary}")
+            sections.append(f"Session summary: {self.session_summary}")
         
-        return "\n".join(context_parts) if context_parts else "No previous context."
+        # Research topics context
+        if self.research_topics:
+            sections.append(f"Ongoing research topics: {', '.join(list(self.research_topics)[-5:])}")
+        
+        # Recent conversation context
+        # Snapshot the small mirror so concurrent writes can't disturb iteration
+        recent_lines = tuple(self._recent_lines)
+        if recent_lines:
+            sections.append("\n".join(("Recent conversation:",) + recent_lines))
+        
+        return "\n\n".join(sections) if sections else empty
     
     def clear_memory(self):
         """Clear all conversation history and research context"""
-        self.memory.clear()
-        self.research_topics = []
-        self.session_summary = ""
+        with self._lock:
+            self.memory.clear()
+            self.research_topics.clear()
+            self._topics_set.clear()
+            self.session_summary = ""
+            self._history_lines.clear()
+            self._recent_lines.clear()
+            self._human_count = 0
+            self._ai_count = 0
+            self._formatted_cache = None
+            
+            # Discard any summary still being computed for the old history
+            self._generation += 1
     
     def update_session_summary(self, summary: str):
         """Update the session summary with key research findings"""
-        self.session_summary = summary
+        with self._lock:
+            self.session_summary = summary
+    
+    def _schedule_summary(self):
+        """Summarize messages that have slid out of the window, if enough have"""
+        if self._summarizing:
+            return
+        
+        messages = self.memory.chat_memory.messages
+        overflow = len(messages) - 2 * self.memory.k
+        if overflow < _SUMMARY_BATCH:
+            return
+        
+        # Without a summarizer nothing reads turns outside the window
+        if self._summary_pool is None:
+            self._drop_oldest(messages[:overflow])
+            return
+        
+        self._summarizing = True
+        self._summary_pool.submit(
+            self._summarize_old, list(messages[:overflow]), self.session_summary, self._generation
+        )
+    
+    def _summarize_old(self, old_messages: List[BaseMessage], summary: str, generation: int):
+        """Fold old messages into the session summary and drop them from history"""
+        try:
+            new_summary = self.summarize_fn(summary, old_messages)
+        except Exception as e:
+            print(f"Memory summarization failed: {str(e)}")
+            new_summary = None
+        
+        with self._lock:
+            self._summarizing = False
+            if not new_summary or generation != self._generation:
+                return
+            
+            # Only appends happened meanwhile, so the folded messages are still first
+            self._drop_oldest(old_messages)
+            self.session_summary = new_summary
+    
+    def _drop_oldest(self, old_messages: List[BaseMessage]):
+        """Remove the oldest messages from history; caller must hold the lock"""
+        count = len(old_messages)
+        del self.memory.chat_memory.messages[:count]
+        del self._history_lines[:count]
+        self._human_count -= sum(isinstance(m, HumanMessage) for m in old_messages)
+        self._ai_count -= sum(isinstance(m, AIMessage) for m in old_messages)
+        self._formatted_cache = None
     
     def _extract_research_topics(self, message: str):
         """Extract potential research topics from user messages"""
-        # Simple keyword extraction for research topics
-        research_keywords = [
-            "research", "analyze", "study", "investigate", "examine",
-            "explore", "report", "trends", "statistics", "data"
-        ]
-        
-        message_lower = message.lower()
-        
-        # Look for research-related phrases
-        for keyword in research_keywords:
-            if keyword in message_lower:
-                # Extract the main topic (simplified approach)
-                words = message.split()
-                for i, word in enumerate(words):
-                    if word.lower() == keyword and i + 1 < len(words):
-                        # Take the next few words as potential topic
-                        topic = " ".join(words[i+1:i+4])
-                        topic = topic.replace("?", "").replace(".", "").strip()
-                        if len(topic) > 3 and topic not in self.research_topics:
-                            self.research_topics.append(topic)
-                        break
-        
-        # Keep only recent topics (last 10)
-        self.research_topics = self.research_topics[-10:]
+        seen_keywords = set()
+        
+        # Single pass over the message; only the first use of each keyword counts
+        for match in _KW_RE.finditer(message):
+            keyword = match.group(1).lower()
+            if keyword in seen_keywords:
+                continue
+            seen_keywords.add(keyword)
+            
+            # Take the next few words as potential topic
+            topic = " ".join(match.group(2).split()).translate(_TOPIC_STRIP).strip()
+            if len(topic) > 3 and topic not in self._topics_set:
+                # Keep only recent topics; drop the oldest from the set as it's evicted
+                if len(self.research_topics) == _MAX_TOPICS:
+                    self._topics_set.discard(self.research_topics[0])
+                self.research_topics.append(topic)
+                self._topics_set.add(topic)
     
     def get_memory_stats(self) -> Dict[str, Any]:
         """Get memory statistics for debugging/monitoring"""
-        messages = self.get_conversation_history()
-        
         return {
-            "total_messages": len(messages),
-            "human_messages": len([m for m in messages if isinstance(m, HumanMessage)]),
-            "ai_messages": len([m for m in messages if isinstance(m, AIMessage)]),
+            "total_messages": len(self.get_conversation_history()),
+            "human_messages": self._human_count,
+            "ai_messages": self._ai_count,
             "research_topics_count": len(self.research_topics),
             "has_session_summary": bool(self.session_summary),
             "memory_key": CONVERSATION_MEMORY_KEY
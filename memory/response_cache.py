@@ -0,0 +1,198 @@
+"""
+Response caching for the research agent
+"""
+
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, List, Optional
+
+import numpy as np
+
+from config import RESPONSE_CACHE_SIZE, SEMANTIC_CACHE_THRESHOLD, RESPONSE_CACHE_TTL_SECONDS
+
+
+# Rows allocated at a time for the embedding matrix
+_EMBEDDING_BLOCK = 1024
+
+# Queries asking for up-to-date information are never cached
+_FRESHNESS_TERMS = re.compile(
+    r'\b(?:latest|today|tonight|yesterday|current(?:ly)?|recent(?:ly)?|now|news|this (?:week|month|year)|(?:19|20)\d{2})\b',
+    re.IGNORECASE
+)
+
+# Queries asking for a report or file are never cached, since a cached
+# answer would skip the write
+_SIDE_EFFECT_TERMS = re.compile(
+    r'\b(?:reports?|create_report|save|write|files?)\b',
+    re.IGNORECASE
+)
+
+
+class ResearchResponseCache:
+    """
+    Two-tier cache for research responses.
+    Exact repeats are served from an LRU keyed on the normalized query;
+    near-repeats are matched by cosine similarity of query embeddings,
+    scored against all stored embeddings in one matrix-vector product.
+    Entries expire after a TTL, and time-sensitive or report-writing
+    queries bypass the cache.
+    """
+
+    def __init__(
+        self,
+        embed_fn: Optional[Callable[[str], List[float]]] = None,
+        max_size: int = RESPONSE_CACHE_SIZE,
+        similarity_threshold: float = SEMANTIC_CACHE_THRESHOLD,
+        ttl_seconds: float = RESPONSE_CACHE_TTL_SECONDS,
+    ):
+        """
+        Initialize the response cache
+
+        Args:
+            embed_fn: Function returning an embedding for a query, or None
+                to disable the semantic tier
+            max_size: Maximum number of cached responses per tier
+            similarity_threshold: Minimum cosine similarity for a semantic hit
+            ttl_seconds: Seconds a cached response stays valid
+        """
+        self.embed_fn = embed_fn
+        self.max_size = max_size
+        self.similarity_threshold = similarity_threshold
+        self.ttl_seconds = ttl_seconds
+
+        self._lock = threading.Lock()
+        # Normalized query -> (response, monotonic expiry time)
+        self._exact: "OrderedDict[str, tuple]" = OrderedDict()
+
+        # Semantic tier: ring buffer of unit-normalized embeddings (one per
+        # row, float32, C-contiguous) aligned with their responses
+        self._emb_matrix: Optional[np.ndarray] = None
+        self._results: List[str] = []
+        self._expires: List[float] = []
+        self._emb_count = 0
+        self._next_row = 0
+
+        # Embeddings computed on a miss, reused by the following put()
+        self._pending: dict = {}
+
+    @staticmethod
+    def normalize(query: str) -> str:
+        """Normalize a query for exact matching"""
+        return " ".join(query.lower().split())
+
+    @staticmethod
+    def is_cacheable(query: str) -> bool:
+        """Whether the query may be answered from (or stored in) the cache"""
+        return _FRESHNESS_TERMS.search(query) is None and _SIDE_EFFECT_TERMS.search(query) is None
+
+    def get(self, query: str) -> Optional[str]:
+        """Return a cached response for the query, or None on a miss"""
+        if not self.is_cacheable(query):
+            return None
+
+        key = self.normalize(query)
+        now = time.monotonic()
+
+        with self._lock:
+            entry = self._exact.get(key)
+            if entry is not None:
+                if entry[1] > now:
+                    self._exact.move_to_end(key)
+                    return entry[0]
+                del self._exact[key]
+
+        embedding = self._embed(key)
+        if embedding is None:
+            return None
+
+        with self._lock:
+            if len(self._pending) >= self.max_size:
+                self._pending.clear()
+            self._pending[key] = embedding
+            if not self._emb_count:
+                return None
+
+            # Rows and query are unit-normalized, so this is cosine similarity
+            scores = self._emb_matrix[:self._emb_count] @ embedding
+            best = int(np.argmax(scores))
+            if scores[best] >= self.similarity_threshold and self._expires[best] > now:
+                return self._results[best]
+
+        return None
+
+    def put(self, query: str, result: str):
+        """Store a response for the query in both tiers"""
+        if not self.is_cacheable(query):
+            return
+
+        key = self.normalize(query)
+
+        with self._lock:
+            embedding = self._pending.pop(key, None)
+        if embedding is None:
+            embedding = self._embed(key)
+
+        expires = time.monotonic() + self.ttl_seconds
+
+        with self._lock:
+            self._exact[key] = (result, expires)
+            self._exact.move_to_end(key)
+            if len(self._exact) > self.max_size:
+                self._exact.popitem(last=False)
+
+            if embedding is not None:
+                self._store_embedding(embedding, result, expires)
+
+    def clear(self):
+        """Drop all cached responses"""
+        with self._lock:
+            self._exact.clear()
+            self._emb_matrix = None
+            self._results = []
+            self._expires = []
+            self._emb_count = 0
+            self._next_row = 0
+            self._pending.clear()
+
+    def __len__(self) -> int:
+        return len(self._exact)
+
+    def _store_embedding(self, embedding: np.ndarray, result: str, expires: float):
+        """Write an embedding row, overwriting the oldest once the cache is full"""
+        if self._emb_matrix is None:
+            rows = min(_EMBEDDING_BLOCK, self.max_size)
+            self._emb_matrix = np.zeros((rows, embedding.shape[0]), dtype=np.float32)
+        elif self._emb_count == len(self._emb_matrix) and self._emb_count < self.max_size:
+            # Grow in blocks so appends stay amortized O(1)
+            rows = min(_EMBEDDING_BLOCK, self.max_size - self._emb_count)
+            padding = np.zeros((rows, self._emb_matrix.shape[1]), dtype=np.float32)
+            self._emb_matrix = np.vstack([self._emb_matrix, padding])
+
+        row = self._next_row
+        self._emb_matrix[row] = embedding
+        if row < len(self._results):
+            self._results[row] = result
+            self._expires[row] = expires
+        else:
+            self._results.append(result)
+            self._expires.append(expires)
+
+        self._emb_count = min(self._emb_count + 1, self.max_size)
+        self._next_row = (row + 1) % self.max_size
+
+    def _embed(self, text: str) -> Optional[np.ndarray]:
+        """Embed and normalize text, returning None if embeddings are unavailable"""
+        if self.embed_fn is None:
+            return None
+
+        try:
+            vector = np.asarray(self.embed_fn(text), dtype=np.float32)
+        except Exception:
+            return None
+
+        norm = np.linalg.norm(vector)
+        if norm == 0:
+            return None
+        return vector / norm
@@ -0,0 +1,482 @@
+"""
+Task storage for the research API
+Keeps task records indexed so status counts and listings avoid full scans
+"""
+
+import json
+import sqlite3
+import threading
+import time
+import uuid
+from collections import Counter, OrderedDict
+from datetime import datetime
+from itertools import islice
+from typing import Optional, Dict, Any, List, Iterable, Callable
+
+
+# Statuses after which a task will not change again
+TERMINAL_STATUSES = frozenset({"completed", "failed", "cancelled"})
+
+# Fields of the listing summary that change over a task's lifetime
+_SUMMARY_FIELDS = ("status", "progress")
+_SUMMARY_QUERY_LENGTH = 100
+
+
+def format_timestamp(timestamp_ns: Optional[int]) -> Optional[str]:
+    """Format a time.time_ns() value as an ISO 8601 string"""
+    if timestamp_ns is None:
+        return None
+    return datetime.fromtimestamp(timestamp_ns / 1e9).isoformat()
+
+
+def summarize_task(task: Dict[str, Any]) -> Dict[str, Any]:
+    """Build the listing summary for a task"""
+    query = task["query"]
+    if len(query) > _SUMMARY_QUERY_LENGTH:
+        query = query[:_SUMMARY_QUERY_LENGTH] + "..."
+    return {
+        "task_id": task["task_id"],
+        "status": task["status"],
+        "query": query,
+        "created_at": format_timestamp(task["created_at_ns"]),
+        "created_at_ns": task["created_at_ns"],
+        "progress": task.get("progress", 0)
+    }
+
+
+class TaskStore:
+    """
+    Thread-safe in-memory store for research task records.
+
+    Tasks are kept in insertion order and per-status counts are maintained
+    incrementally, so health checks are O(1) and listings are O(limit).
+    Listing summaries are rebuilt when a task changes rather than per request.
+    Finished tasks are tracked in completion order so expiry and the size
+    cap only ever touch the entries they evict.
+    """
+
+    # Methods are cheap dict operations, safe to call on the event loop
+    blocking = False
+
+    def __init__(self, max_tasks: Optional[int] = None):
+        """
+        Initialize an empty task store
+
+        Args:
+            max_tasks: Soft cap on stored tasks; the oldest finished tasks
+                are evicted beyond it. None means unbounded.
+        """
+        self.max_tasks = max_tasks
+        # Called with a task_id after every update; set by the API to wake waiters
+        self.on_change: Optional[Callable[[str], None]] = None
+        self._tasks: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._status_counts: Counter = Counter()
+        self._summaries: Dict[str, Dict[str, Any]] = {}
+        self._finished: "OrderedDict[str, float]" = OrderedDict()
+        self._lock = threading.RLock()
+
+    def __contains__(self, task_id: str) -> bool:
+        return task_id in self._tasks
+
+    def __len__(self) -> int:
+        return len(self._tasks)
+
+    def add(self, task: Dict[str, Any]):
+        """Insert a new task record keyed by its task_id"""
+        with self._lock:
+            self._tasks[task["task_id"]] = task
+            self._summaries[task["task_id"]] = summarize_task(task)
+            self._status_counts[task["status"]] += 1
+            if task["status"] in TERMINAL_STATUSES:
+                self._finished[task["task_id"]] = time.monotonic()
+
+            # Make room by dropping the oldest finished tasks
+            if self.max_tasks is not None:
+                while len(self._tasks) > self.max_tasks and self._finished:
+                    oldest_id, _ = self._finished.popitem(last=False)
+                    self._remove(oldest_id)
+
+    def get(self, task_id: str) -> Optional[Dict[str, Any]]:
+        """Return a snapshot of a task record, or None if unknown"""
+        with self._lock:
+            task = self._tasks.get(task_id)
+            return dict(task) if task is not None else None
+
+    def update(self, task_id: str, **fields: Any) -> Dict[str, Any]:
+        """
+        Update fields on a task, keeping status counts in sync
+
+        Returns:
+            Snapshot of the updated task record
+        """
+        with self._lock:
+            task = self._tasks[task_id]
+            new_status = fields.get("status")
+            if new_status is not None and new_status != task["status"]:
+                self._status_counts[task["status"]] -= 1
+                self._status_counts[new_status] += 1
+                if new_status in TERMINAL_STATUSES:
+                    self._finished[task_id] = time.monotonic()
+            task.update(fields)
+
+            if any(name in fields for name in _SUMMARY_FIELDS):
+                summary = dict(self._summaries[task_id])
+                for name in _SUMMARY_FIELDS:
+                    if name in fields:
+                        summary[name] = fields[name]
+                self._summaries[task_id] = summary
+            snapshot = dict(task)
+
+        if self.on_change is not None:
+            self.on_change(task_id)
+        return snapshot
+
+    def transition(self, task_id: str, from_statuses: Iterable[str], **fields: Any) -> bool:
+        """
+        Atomically update a task only if its status is one of from_statuses
+
+        Returns:
+            True if the task was updated
+        """
+        with self._lock:
+            task = self._tasks.get(task_id)
+            if task is None or task["status"] not in from_statuses:
+                return False
+            self.update(task_id, **fields)
+            return True
+
+    def count(self, status: str) -> int:
+        """Number of tasks currently in the given status"""
+        return self._status_counts[status]
+
+    def recent_summaries(self, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """
+        Return listing summaries of the most recently created tasks first
+
+        Summaries are replaced, never mutated, on update, so the returned
+        dicts can be serialized without copying.
+        """
+        with self._lock:
+            return [self._summaries[task_id] for task_id in islice(reversed(self._tasks), limit)]
+
+    def evict_expired(self, ttl_seconds: float) -> int:
+        """
+        Drop finished tasks that completed more than ttl_seconds ago
+
+        Returns:
+            Number of tasks evicted
+        """
+        cutoff = time.monotonic() - ttl_seconds
+        evicted = 0
+        with self._lock:
+            while self._finished:
+                oldest_id, finished_at = next(iter(self._finished.items()))
+                if finished_at > cutoff:
+                    break
+                self._finished.popitem(last=False)
+                self._remove(oldest_id)
+                evicted += 1
+        return evicted
+
+    def recover_interrupted(self) -> int:
+        """Fail tasks orphaned by a dead process; none survive in memory"""
+        return 0
+
+    def release(self):
+        """Called on shutdown; in-memory tasks go away with the process"""
+
+    def _remove(self, task_id: str):
+        """Remove a task record; caller must hold the lock"""
+        task = self._tasks.pop(task_id, None)
+        if task is not None:
+            self._summaries.pop(task_id, None)
+            self._status_counts[task["status"]] -= 1
+
+
+class SQLiteTaskStore:
+    """
+    Task store persisted to SQLite, with the same interface as TaskStore.
+
+    Runs in WAL mode so readers never block the writer, and so several
+    uvicorn workers can share one database file. Task records survive
+    API restarts and crashes.
+
+    Each store registers as an owner of the tasks it creates and refreshes
+    a heartbeat on every sweep. Unfinished tasks whose owner shut down or
+    stopped heartbeating are marked failed, so they don't stay "processing"
+    forever after a restart. Listing fields are stored alongside each task
+    at insert time, and the size cap is enforced by the sweep rather than
+    on every insert.
+    """
+
+    # Methods do disk I/O; async callers should run them on a thread
+    blocking = True
+
+    _COLUMNS = (
+        "task_id", "status", "query", "created_at_ns", "completed_at_ns",
+        "progress", "result", "error", "files_generated"
+    )
+    _JSON_COLUMNS = frozenset({"files_generated"})
+    # Columns added after the first release of the schema
+    _ADDED_COLUMNS = ("owner_id", "summary_query", "summary_created_at")
+
+    INTERRUPTED_ERROR = "Interrupted by a server restart"
+
+    def __init__(self, path: str, max_tasks: Optional[int] = None, stale_after: float = 180):
+        """
+        Open (or create) the task database
+
+        Args:
+            path: SQLite database file path
+            max_tasks: Soft cap on stored tasks; the oldest finished tasks
+                are evicted beyond it by evict_expired. None means unbounded.
+            stale_after: Seconds without a heartbeat after which another
+                owner's unfinished tasks are considered orphaned
+        """
+        self.max_tasks = max_tasks
+        self.stale_after = stale_after
+        # Called with a task_id after every update; set by the API to wake waiters
+        self.on_change: Optional[Callable[[str], None]] = None
+        self.owner_id = uuid.uuid4().hex
+        self._lock = threading.RLock()
+
+        # Autocommit mode; the connection is shared by the pool threads
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("PRAGMA busy_timeout=5000")
+        self._conn.executescript("""
+            CREATE TABLE IF NOT EXISTS tasks (
+                task_id TEXT PRIMARY KEY,
+                status TEXT NOT NULL,
+                query TEXT NOT NULL,
+                created_at_ns INTEGER NOT NULL,
+                completed_at_ns INTEGER,
+                progress INTEGER NOT NULL DEFAULT 0,
+                result TEXT,
+                error TEXT,
+                files_generated TEXT,
+                owner_id TEXT,
+                summary_query TEXT,
+                summary_created_at TEXT
+            );
+            CREATE INDEX IF NOT EXISTS idx_tasks_created ON tasks (created_at_ns);
+            CREATE INDEX IF NOT EXISTS idx_tasks_status ON tasks (status, completed_at_ns);
+            CREATE TABLE IF NOT EXISTS owners (
+                owner_id TEXT PRIMARY KEY,
+                heartbeat_ns INTEGER NOT NULL
+            );
+        """)
+        self._migrate()
+        self._heartbeat()
+
+    def __contains__(self, task_id: str) -> bool:
+        with self._lock:
+            row = self._conn.execute("SELECT 1 FROM tasks WHERE task_id = ?", (task_id,)).fetchone()
+        return row is not None
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM tasks").fetchone()[0]
+
+    def add(self, task: Dict[str, Any]):
+        """Insert a new task record keyed by its task_id"""
+        summary = summarize_task(task)
+        columns = [name for name in self._COLUMNS if name in task]
+        values = [self._encode(name, task[name]) for name in columns]
+        columns += ["owner_id", "summary_query", "summary_created_at"]
+        values += [self.owner_id, summary["query"], summary["created_at"]]
+        placeholders = ", ".join("?" for _ in columns)
+
+        with self._lock:
+            self._conn.execute(
+                f"INSERT OR REPLACE INTO tasks ({', '.join(columns)}) VALUES ({placeholders})",
+                values
+            )
+
+    def get(self, task_id: str) -> Optional[Dict[str, Any]]:
+        """Return a task record, or None if unknown"""
+        with self._lock:
+            row = self._conn.execute(
+                f"SELECT {', '.join(self._COLUMNS)} FROM tasks WHERE task_id = ?", (task_id,)
+            ).fetchone()
+        return self._decode(row) if row is not None else None
+
+    def update(self, task_id: str, **fields: Any) -> Dict[str, Any]:
+        """
+        Update fields on a task
+
+        Returns:
+            The updated task record
+
+        Raises:
+            KeyError: If the task doesn't exist, as with TaskStore
+        """
+        with self._lock:
+            if self._set(task_id, fields) == 0:
+                raise KeyError(task_id)
+            task = self.get(task_id)
+
+        if self.on_change is not None:
+            self.on_change(task_id)
+        return task
+
+    def transition(self, task_id: str, from_statuses: Iterable[str], **fields: Any) -> bool:
+        """
+        Atomically update a task only if its status is one of from_statuses
+
+        Returns:
+            True if the task was updated
+        """
+        from_statuses = tuple(from_statuses)
+        condition = f"status IN ({', '.join('?' for _ in from_statuses)})"
+        with self._lock:
+            updated = self._set(task_id, fields, condition, from_statuses) == 1
+
+        if updated and self.on_change is not None:
+            self.on_change(task_id)
+        return updated
+
+    def count(self, status: str) -> int:
+        """Number of tasks currently in the given status"""
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM tasks WHERE status = ?", (status,)).fetchone()[0]
+
+    def recent_summaries(self, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Return listing summaries of the most recently created tasks first"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT task_id, status, summary_query, summary_created_at, created_at_ns, progress "
+                "FROM tasks ORDER BY created_at_ns DESC LIMIT ?",
+                (-1 if limit is None else limit,)
+            ).fetchall()
+        return [
+            {
+                "task_id": row[0],
+                "status": row[1],
+                "query": row[2],
+                "created_at": row[3],
+                "created_at_ns": row[4],
+                "progress": row[5]
+            }
+            for row in rows
+        ]
+
+    def evict_expired(self, ttl_seconds: float) -> int:
+        """
+        Drop finished tasks that completed more than ttl_seconds ago, then
+        the oldest finished tasks while more than max_tasks are stored
+
+        Returns:
+            Number of tasks evicted
+        """
+        cutoff_ns = time.time_ns() - int(ttl_seconds * 1e9)
+        with self._lock:
+            evicted = self._conn.execute(
+                f"DELETE FROM tasks WHERE status IN ({self._terminal_placeholders()}) AND completed_at_ns < ?",
+                (*TERMINAL_STATUSES, cutoff_ns)
+            ).rowcount
+
+            if self.max_tasks is not None:
+                excess = len(self) - self.max_tasks
+                if excess > 0:
+                    evicted += self._conn.execute(
+                        f"""DELETE FROM tasks WHERE task_id IN (
+                            SELECT task_id FROM tasks WHERE status IN ({self._terminal_placeholders()})
+                            ORDER BY completed_at_ns LIMIT ?)""",
+                        (*TERMINAL_STATUSES, excess)
+                    ).rowcount
+        return evicted
+
+    def recover_interrupted(self) -> int:
+        """
+        Refresh this store's heartbeat and fail unfinished tasks whose owner
+        has shut down or stopped heartbeating
+
+        Returns:
+            Number of tasks marked failed
+        """
+        cutoff_ns = time.time_ns() - int(self.stale_after * 1e9)
+        with self._lock:
+            self._heartbeat()
+            self._conn.execute("DELETE FROM owners WHERE heartbeat_ns < ?", (cutoff_ns,))
+            cursor = self._conn.execute(
+                f"""UPDATE tasks SET status = 'failed', error = ?, completed_at_ns = ?
+                    WHERE status NOT IN ({self._terminal_placeholders()})
+                    AND (owner_id IS NULL OR owner_id NOT IN (SELECT owner_id FROM owners))""",
+                (self.INTERRUPTED_ERROR, time.time_ns(), *TERMINAL_STATUSES)
+            )
+        return cursor.rowcount
+
+    def release(self):
+        """Fail this store's unfinished tasks and unregister it, on shutdown"""
+        with self._lock:
+            self._conn.execute(
+                f"""UPDATE tasks SET status = 'failed', error = ?, completed_at_ns = ?
+                    WHERE owner_id = ? AND status NOT IN ({self._terminal_placeholders()})""",
+                (self.INTERRUPTED_ERROR, time.time_ns(), self.owner_id, *TERMINAL_STATUSES)
+            )
+            self._conn.execute("DELETE FROM owners WHERE owner_id = ?", (self.owner_id,))
+
+    def _heartbeat(self):
+        self._conn.execute(
+            "INSERT OR REPLACE INTO owners (owner_id, heartbeat_ns) VALUES (?, ?)",
+            (self.owner_id, time.time_ns())
+        )
+
+    def _migrate(self):
+        """Add columns missing from databases created by older versions"""
+        with self._lock:
+            # Serialize with other workers opening the same file
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                existing = {row["name"] for row in self._conn.execute("PRAGMA table_info(tasks)")}
+                for name in self._ADDED_COLUMNS:
+                    if name not in existing:
+                        self._conn.execute(f"ALTER TABLE tasks ADD COLUMN {name} TEXT")
+
+                rows = self._conn.execute(
+                    "SELECT task_id, status, query, created_at_ns FROM tasks WHERE summary_query IS NULL"
+                ).fetchall()
+                if rows:
+                    summaries = [summarize_task(dict(row)) for row in rows]
+                    self._conn.executemany(
+                        "UPDATE tasks SET summary_query = ?, summary_created_at = ? WHERE task_id = ?",
+                        [(summary["query"], summary["created_at"], summary["task_id"]) for summary in summaries]
+                    )
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    def _set(self, task_id: str, fields: Dict[str, Any], condition: str = "", params: tuple = ()) -> int:
+        """Run an UPDATE for the given fields; returns the affected row count"""
+        unknown = set(fields) - set(self._COLUMNS)
+        if unknown:
+            raise ValueError(f"Unknown task fields: {', '.join(sorted(unknown))}")
+
+        assignments = ", ".join(f"{name} = ?" for name in fields)
+        values = [self._encode(name, value) for name, value in fields.items()]
+        where = "task_id = ?" + (f" AND {condition}" if condition else "")
+        cursor = self._conn.execute(
+            f"UPDATE tasks SET {assignments} WHERE {where}",
+            (*values, task_id, *params)
+        )
+        return cursor.rowcount
+
+    def _encode(self, name: str, value: Any) -> Any:
+        if name in self._JSON_COLUMNS and value is not None:
+            return json.dumps(value)
+        return value
+
+    def _decode(self, row: sqlite3.Row) -> Dict[str, Any]:
+        task = dict(row)
+        for name in self._JSON_COLUMNS:
+            if task.get(name) is not None:
+                task[name] = json.loads(task[name])
+        return task
+
+    @staticmethod
+    def _terminal_placeholders() -> str:
+        return ", ".join("?" for _ in TERMINAL_STATUSES)
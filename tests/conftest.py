@@ -0,0 +1,22 @@
+"""
+Shared fixtures for the research agent tests
+"""
+
+import os
+from unittest.mock import patch
+
+import pytest
+
+import config
+from agents.research_agent import LangChainResearchAgent
+
+
+@pytest.fixture
+def agent(tmp_path, monkeypatch):
+    """Research agent with a mocked Gemini client and temporary output directories"""
+    monkeypatch.setattr(config, "REPORTS_DIR", os.path.join(tmp_path, "reports"))
+    monkeypatch.setattr(config, "DATA_DIR", os.path.join(tmp_path, "data"))
+    monkeypatch.setattr("agents.research_agent._GEMINI_CLIENT", None)
+    
+    with patch("agents.research_agent.genai.Client"):
+        yield LangChainResearchAgent()
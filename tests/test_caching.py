@@ -0,0 +1,54 @@
+"""
+Tests for which research answers go into the response cache
+"""
+
+import asyncio
+
+from langchain_core.agents import AgentAction
+
+from memory.response_cache import ResearchResponseCache
+
+
+QUERY = "Explain how photosynthesis converts light into chemical energy"
+
+
+class _StubExecutor:
+    """Stands in for the AgentExecutor, returning a fixed run"""
+
+    def __init__(self, output: str, tools=()):
+        self.response = {
+            "output": output,
+            "intermediate_steps": [(AgentAction(tool, "input", ""), "observation") for tool in tools]
+        }
+
+    def invoke(self, inputs, config=None):
+        return self.response
+
+    async def ainvoke(self, inputs, config=None):
+        return self.response
+
+
+def test_answer_without_side_effects_is_cached(agent):
+    agent.response_cache.embed_fn = None
+    agent.agent_executor = _StubExecutor("Plants use chlorophyll.", tools=["web_search"])
+
+    agent.research(QUERY)
+
+    assert agent.response_cache.get(QUERY) == "Plants use chlorophyll."
+
+
+def test_run_that_wrote_a_file_is_not_cached(agent):
+    agent.response_cache.embed_fn = None
+    agent.agent_executor = _StubExecutor("Plants use chlorophyll.", tools=["web_search", "file_operations"])
+
+    agent.research(QUERY)
+    asyncio.run(agent.research_many([QUERY]))
+    "".join(agent.stream(QUERY))
+
+    assert agent.response_cache.get(QUERY) is None
+
+
+def test_report_requests_bypass_the_cache():
+    assert not ResearchResponseCache.is_cacheable("Research photosynthesis and create a report")
+    assert not ResearchResponseCache.is_cacheable("Save the findings to a file")
+    assert ResearchResponseCache.is_cacheable(QUERY)
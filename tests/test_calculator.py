@@ -0,0 +1,35 @@
+"""
+Tests for the calculator tool's expression evaluator
+"""
+
+import time
+
+import pytest
+
+
+@pytest.fixture
+def calculator(agent):
+    return agent._tools_by_name["calculator"]
+
+
+@pytest.mark.parametrize("expression, expected", [
+    ("2 + 2", "Result: 4"),
+    ("10 * 3", "Result: 30"),
+    ("2 ^ 10", "Result: 1024"),
+    ("50% of 200", "50.0% of 200.0 = 100.0"),
+])
+def test_basic_arithmetic(calculator, expression, expected):
+    assert calculator._run(expression) == expected
+
+
+@pytest.mark.parametrize("expression", [
+    "((9^999)^999)^999",
+    "9^9^9",
+    "(10^1000) * (10^1000) * (10^1000)",
+])
+def test_oversized_results_fail_fast(calculator, expression):
+    start = time.perf_counter()
+    result = calculator._run(expression)
+    
+    assert result == "Calculation error: result too large"
+    assert time.perf_counter() - start < 1.0
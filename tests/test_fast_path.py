@@ -0,0 +1,42 @@
+"""
+Tests for queries answered without running the ReAct loop
+"""
+
+import time
+
+
+def test_arithmetic_is_calculated_directly(agent):
+    assert agent.research_fast_path("12 * (3 + 4)") == "Result: 84"
+
+
+def test_oversized_arithmetic_fails_fast(agent):
+    start = time.perf_counter()
+    result = agent.research_fast_path("((9^999)^999)^999")
+    
+    assert result == "Calculation error: result too large"
+    assert time.perf_counter() - start < 1.0
+
+
+def test_short_inputs_are_rejected(agent):
+    assert agent.research_fast_path(" a ").startswith("Please provide")
+
+
+def test_direct_answers_are_not_cached(agent):
+    agent.response_cache.embed_fn = None
+    agent.llm.client.models.generate_content.return_value.text = "Ottawa."
+    
+    assert agent.research_fast_path("Capital of Canada?") == "Ottawa."
+    assert agent.response_cache.get("Capital of Canada?") is None
+
+
+def test_changing_facts_go_through_the_agent(agent):
+    agent.response_cache.embed_fn = None
+    
+    assert agent.research_fast_path("Who is the CEO of OpenAI?") is None
+    assert agent.research_fast_path("Population of Tokyo?") is None
+
+
+def test_percentages_are_not_sent_to_the_calculator(agent):
+    agent.response_cache.embed_fn = None
+    
+    assert agent.research_fast_path("50%") is None
@@ -0,0 +1,74 @@
+"""
+Tests for carrying conversation memory into the agent prompt
+"""
+
+import pytest
+
+from agents.research_agent import LangChainResearchAgent
+
+
+QUERY = "Explain how photosynthesis converts light into chemical energy"
+
+
+@pytest.fixture
+def session_agent(agent):
+    """Single-user agent that shows its conversation memory to the model"""
+    return LangChainResearchAgent(session_context=True)
+
+
+class _RecordingExecutor:
+    """Stands in for the AgentExecutor, remembering the inputs of its run"""
+
+    def invoke(self, inputs, config=None):
+        self.inputs = inputs
+        return {"output": "Light drives the reactions.", "intermediate_steps": []}
+
+
+def _agent_prompt(agent) -> str:
+    prompt = agent.agent_executor.agent.llm_chain.prompt
+    return prompt.format(agent_scratchpad="", **agent._agent_inputs(QUERY))
+
+
+def test_prompt_has_no_context_section_for_a_new_session(session_agent):
+    assert _agent_prompt(session_agent).endswith(f"Begin!\n\nQuestion: {QUERY}\nThought:")
+
+
+def test_context_runs_from_summary_to_recent_turns(session_agent):
+    session_agent.memory.update_session_summary("The user is studying plant biology.")
+    session_agent.memory.add_exchanges([("Research chlorophyll pigments", "They absorb red and blue light.")])
+
+    assert _agent_prompt(session_agent).endswith(
+        "Research context:\n"
+        "Session summary: The user is studying plant biology.\n\n"
+        "Ongoing research topics: chlorophyll pigments\n\n"
+        "Recent conversation:\n"
+        "- Human: Research chlorophyll pigments\n"
+        "- Assistant: They absorb red and blue light.\n\n"
+        f"Question: {QUERY}\nThought:"
+    )
+
+
+def test_context_excludes_the_question_being_answered(session_agent):
+    session_agent.agent_executor = _RecordingExecutor()
+
+    session_agent.research(QUERY)
+
+    assert QUERY not in session_agent.agent_executor.inputs["session_context"]
+
+
+def test_shared_agent_keeps_memory_out_of_prompts(agent):
+    agent.memory.update_session_summary("Another client asked about their medical records.")
+    agent.memory.add_exchanges([("Research my medical records", "Here they are.")])
+
+    assert agent.memory.summarize_fn is None
+    assert "medical records" not in _agent_prompt(agent)
+
+
+def test_shared_agent_drops_turns_outside_the_window(agent):
+    k = agent.memory.memory.k
+    agent.memory.add_exchanges([(f"question {i}", f"answer {i}") for i in range(k + 5)])
+
+    history = agent.memory.get_conversation_history()
+    assert len(history) <= 2 * k + 4
+    assert history[-1].content == f"answer {k + 4}"
+    assert agent.memory.get_memory_stats()["human_messages"] == len(history) // 2
@@ -0,0 +1,38 @@
+"""
+Tests for the report-writing tool
+"""
+
+import os
+import shutil
+
+import config
+
+
+def _create_report(agent, title="Solar Power"):
+    return agent._tools_by_name["file_operations"]._run(f"create_report:{title}:Panels got cheaper.")
+
+
+def test_success_is_reported_once_the_file_exists(agent):
+    result = _create_report(agent)
+
+    assert result.startswith("SUCCESS: ")
+    filepath = result.rsplit(" created at ", 1)[1]
+    with open(filepath, encoding="utf-8") as f:
+        assert "Panels got cheaper." in f.read()
+
+
+def test_deleted_reports_directory_is_recreated(agent):
+    assert _create_report(agent).startswith("SUCCESS: ")
+    shutil.rmtree(config.REPORTS_DIR)
+
+    assert _create_report(agent, title="Wind Power").startswith("SUCCESS: ")
+    assert os.listdir(config.REPORTS_DIR)
+
+
+def test_failed_write_is_reported(agent):
+    # A file in place of the reports directory makes every write fail
+    shutil.rmtree(config.REPORTS_DIR)
+    with open(config.REPORTS_DIR, "w", encoding="utf-8") as f:
+        f.write("not a directory")
+
+    assert _create_report(agent).startswith("FAILED: Could not create report")
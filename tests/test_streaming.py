@@ -0,0 +1,82 @@
+"""
+Tests for streaming the agent's final answer
+"""
+
+import queue
+
+import pytest
+from langchain.agents.mrkl.output_parser import MRKLOutputParser
+
+from agents.research_agent import _FinalAnswerStreamer
+
+
+# A final step followed by a hallucinated action, which the parser cuts off
+HALLUCINATED_ACTION_STEP = (
+    "Thought: I know the answer.\n"
+    "Final Answer: Paris is the capital.\n\n"
+    "Action: web_search\n"
+    "Action Input: capital"
+)
+MULTI_PARAGRAPH_STEP = (
+    "Thought: I now know the final answer\n"
+    "Final Answer: Paris is the capital of France.\n\n"
+    "It has been the capital since 987."
+)
+
+
+class _ScriptedExecutor:
+    """Stands in for the AgentExecutor, streaming one scripted LLM step"""
+    
+    def __init__(self, text: str, chunk_size: int):
+        self.text = text
+        self.chunk_size = chunk_size
+    
+    def invoke(self, inputs, config):
+        handler = config["callbacks"][0]
+        handler.on_llm_start({}, [inputs["input"]])
+        for i in range(0, len(self.text), self.chunk_size):
+            handler.on_llm_new_token(self.text[i:i + self.chunk_size])
+        return {"output": MRKLOutputParser().parse(self.text).return_values["output"]}
+
+
+def _drain(sink: queue.Queue) -> str:
+    parts = []
+    while not sink.empty():
+        parts.append(sink.get())
+    return "".join(parts)
+
+
+@pytest.mark.parametrize("chunk_size", [1, 3, 7, 1000])
+def test_streamer_stops_before_hallucinated_action(chunk_size):
+    sink = queue.Queue()
+    streamer = _FinalAnswerStreamer(sink)
+    
+    streamer.on_llm_start({}, ["prompt"])
+    for i in range(0, len(HALLUCINATED_ACTION_STEP), chunk_size):
+        streamer.on_llm_new_token(HALLUCINATED_ACTION_STEP[i:i + chunk_size])
+    
+    assert _drain(sink) == "Paris is the capital."
+
+
+def test_streamer_ignores_answer_after_action():
+    sink = queue.Queue()
+    streamer = _FinalAnswerStreamer(sink)
+    
+    streamer.on_llm_start({}, ["prompt"])
+    streamer.on_llm_new_token("Action: web_search\nAction Input: x\nFinal Answer: guessed")
+    
+    assert sink.empty()
+
+
+@pytest.mark.parametrize("step", [HALLUCINATED_ACTION_STEP, MULTI_PARAGRAPH_STEP])
+@pytest.mark.parametrize("chunk_size", [1, 5, 1000])
+def test_stream_matches_stored_result(agent, step, chunk_size):
+    agent.response_cache.embed_fn = None
+    agent.agent_executor = _ScriptedExecutor(step, chunk_size)
+    query = "Research the capital of France"
+    
+    streamed = "".join(agent.stream(query))
+    stored = agent.memory.get_conversation_history()[-1].content
+    
+    assert streamed == stored
+    assert streamed == MRKLOutputParser().parse(step).return_values["output"]
@@ -0,0 +1,114 @@
+"""
+Tests for the in-memory and SQLite task stores
+"""
+
+import sqlite3
+import time
+
+import pytest
+
+from tasks import SQLiteTaskStore, TaskStore, summarize_task
+
+
+def _task(task_id, status="queued", query="What is the tallest mountain?"):
+    return {
+        "task_id": task_id,
+        "status": status,
+        "query": query,
+        "created_at_ns": time.time_ns(),
+        "result": None,
+        "error": None,
+        "progress": 0,
+        "files_generated": []
+    }
+
+
+def test_restart_fails_tasks_of_a_released_store(tmp_path):
+    path = str(tmp_path / "tasks.db")
+    store = SQLiteTaskStore(path)
+    store.add(_task("a"))
+    store.add(_task("b", status="completed"))
+    store.release()
+
+    restarted = SQLiteTaskStore(path)
+    assert restarted.count("queued") == 0
+    assert restarted.get("a")["status"] == "failed"
+    assert restarted.get("a")["error"] == SQLiteTaskStore.INTERRUPTED_ERROR
+    assert restarted.get("b")["status"] == "completed"
+
+
+def test_recover_fails_only_tasks_of_stale_owners(tmp_path):
+    path = str(tmp_path / "tasks.db")
+    crashed = SQLiteTaskStore(path, stale_after=0)
+    crashed.add(_task("orphan", status="processing"))
+
+    live = SQLiteTaskStore(path, stale_after=0)
+    live.add(_task("own", status="processing"))
+    assert live.recover_interrupted() == 1
+    assert live.get("orphan")["status"] == "failed"
+    assert live.get("own")["status"] == "processing"
+
+
+def test_recover_keeps_tasks_of_other_live_owners(tmp_path):
+    path = str(tmp_path / "tasks.db")
+    other = SQLiteTaskStore(path)
+    other.add(_task("theirs", status="processing"))
+
+    assert SQLiteTaskStore(path).recover_interrupted() == 0
+    assert other.get("theirs")["status"] == "processing"
+
+
+def test_summaries_match_in_memory_store(tmp_path):
+    memory_store = TaskStore()
+    sqlite_store = SQLiteTaskStore(str(tmp_path / "tasks.db"))
+    task = _task("a", query="x" * 150)
+    for store in (memory_store, sqlite_store):
+        store.add(dict(task))
+        store.update("a", status="processing", progress=25)
+
+    assert sqlite_store.recent_summaries() == memory_store.recent_summaries()
+    assert set(sqlite_store.get("a")) == set(SQLiteTaskStore._COLUMNS)
+
+
+def test_old_database_is_migrated(tmp_path):
+    path = str(tmp_path / "tasks.db")
+    task = _task("old", status="completed")
+    conn = sqlite3.connect(path)
+    conn.execute("""
+        CREATE TABLE tasks (
+            task_id TEXT PRIMARY KEY, status TEXT NOT NULL, query TEXT NOT NULL,
+            created_at_ns INTEGER NOT NULL, completed_at_ns INTEGER,
+            progress INTEGER NOT NULL DEFAULT 0, result TEXT, error TEXT, files_generated TEXT
+        )
+    """)
+    conn.execute(
+        "INSERT INTO tasks (task_id, status, query, created_at_ns) VALUES (?, ?, ?, ?)",
+        (task["task_id"], task["status"], task["query"], task["created_at_ns"])
+    )
+    conn.commit()
+    conn.close()
+
+    store = SQLiteTaskStore(path)
+    assert store.recent_summaries() == [summarize_task(task)]
+
+
+def test_size_cap_is_enforced_by_sweep(tmp_path):
+    store = SQLiteTaskStore(str(tmp_path / "tasks.db"), max_tasks=2)
+    for index in range(4):
+        store.add(_task(str(index)))
+        store.update(str(index), status="completed", completed_at_ns=time.time_ns())
+
+    assert len(store) == 4
+    assert store.evict_expired(ttl_seconds=3600) == 2
+    assert [summary["task_id"] for summary in store.recent_summaries()] == ["3", "2"]
+
+
+@pytest.mark.parametrize("make_store", [
+    lambda tmp_path: TaskStore(),
+    lambda tmp_path: SQLiteTaskStore(str(tmp_path / "tasks.db")),
+])
+def test_updating_an_unknown_task_raises_key_error(tmp_path, make_store):
+    store = make_store(tmp_path)
+
+    with pytest.raises(KeyError):
+        store.update("missing", status="completed")
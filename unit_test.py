@@ -4,59 +4,85 @@ FastAPI Background Tasks Test Script
 Tests the API endpoints and background processing
 """
 
-import requests
-import time
-import json
+import asyncio
+import httpx
+import logging
+import orjson
+import re
 import sys
+import time
+
+
+# Per-request details; shown with -v/--verbose
+log = logging.getLogger("api_tests")
+
+# Statuses after which a task will not change again
+FINAL_STATUSES = ("completed", "failed", "cancelled")
+
+# Task IDs issued by the API are canonical lowercase UUID4 strings
+_UUID_RE = re.compile(r'[0-9a-f]{8}-[0-9a-f]{4}-4[0-9a-f]{3}-[89ab][0-9a-f]{3}-[0-9a-f]{12}')
+
+# Seconds the server holds each status long-poll open
+LONG_POLL_WAIT = 30
 
 
 class FastAPITester:
     """Test the FastAPI Background Tasks implementation"""
     
-    def __init__(self, base_url: str = "http://localhost:8080"):
+    def __init__(self, base_url: str = "http://localhost:8000"):
         self.base_url = base_url.rstrip('/')
-        self.session = requests.Session()
+        # One pooled client; HTTP/2 multiplexes requests when the server offers it
+        self.session = httpx.AsyncClient(
+            base_url=self.base_url,
+            http2=True,
+            timeout=30.0,
+            limits=httpx.Limits(max_keepalive_connections=32, max_connections=64)
+        )
+    
+    async def aclose(self):
+        """Close the underlying HTTP client"""
+        await self.session.aclose()
         
-    def test_health_check(self) -> bool:
+    async def test_health_check(self) -> bool:
         """Test the health check endpoint"""
         print("Testing health check...")
         
         try:
-            response = self.session.get(f"{self.base_url}/health")
+            response = await self.session.get("/health")
             response.raise_for_status()
             
-            health_data = response.json()
+            health_data = orjson.loads(response.content)
             print(f"Health check passed: {health_data['status']}")
-            print(f"   Active tasks: {health_data['active_tasks']}")
-            print(f"   Total tasks: {health_data['total_tasks']}")
+            log.info("   Active tasks: %s", health_data['active_tasks'])
+            log.info("   Total tasks: %s", health_data['total_tasks'])
             return True
             
         except Exception as e:
             print(f"Health check failed: {e}")
             return False
     
-    def test_api_info(self) -> bool:
+    async def test_api_info(self) -> bool:
         """Test the root API info endpoint"""
         print("\nTesting API info...")
         
         try:
-            response = self.session.get(f"{self.base_url}/")
+            response = await self.session.get("/")
             response.raise_for_status()
             
-            info_data = response.json()
+            info_data = orjson.loads(response.content)
             print(f"API Info: {info_data['message']}")
-            print(f"   Version: {info_data['version']}")
-            print(f"   Framework: {info_data['framework']}")
+            log.info("   Version: %s", info_data['version'])
+            log.info("   Framework: %s", info_data['framework'])
             return True
             
         except Exception as e:
             print(f"API info failed: {e}")
             return False
     
-    def test_research_submission(self, query: str = "What is machine learning?") -> str:
+    async def test_research_submission(self, query: str = "What is machine learning?") -> str:
         """Test research request submission"""
         print(f"\nTesting research submission...")
-        print(f"   Query: {query}")
+        log.info("   Query: %s", query)
         
         try:
             payload = {
@@ -65,20 +91,22 @@ class FastAPITester:
                 "create_report": False
             }
             
-            response = self.session.post(
-                f"{self.base_url}/research",
-                json=payload,
+            response = await self.session.post(
+                "/research",
+                content=orjson.dumps(payload),
                 headers={"Content-Type": "application/json"}
             )
             response.raise_for_status()
             
-            task_data = response.json()
+            task_data = orjson.loads(response.content)
             task_id = task_data["task_id"]
+            if not _UUID_RE.fullmatch(task_id):
+                raise ValueError(f"Malformed task ID: {task_id}")
             
             print(f"Research submitted successfully")
-            print(f"   Task ID: {task_id}")
-            print(f"   Status: {task_data['status']}")
-            print(f"   Estimated time: {task_data.get('estimated_time', 'Unknown')}")
+            log.info("   Task ID: %s", task_id)
+            log.info("   Status: %s", task_data['status'])
+            log.info("   Estimated time: %s", task_data.get('estimated_time', 'Unknown'))
             
             return task_id
             
@@ -86,20 +114,52 @@ class FastAPITester:
             print(f"Research submission failed: {e}")
             return ""
     
-    def test_task_status(self, task_id: str) -> dict:
+    async def test_batch_submission(self, queries: list) -> list:
+        """Test submitting several research requests in one call"""
+        print(f"\nTesting batch submission of {len(queries)} queries...")
+        
+        try:
+            payload = {"queries": queries}
+            
+            start_time = time.perf_counter()
+            response = await self.session.post(
+                "/research/batch",
+                content=orjson.dumps(payload),
+                headers={"Content-Type": "application/json"}
+            )
+            response.raise_for_status()
+            elapsed = time.perf_counter() - start_time
+            
+            batch_data = orjson.loads(response.content)
+            task_ids = batch_data["task_ids"]
+            malformed = [task_id for task_id in task_ids if not _UUID_RE.fullmatch(task_id)]
+            if malformed:
+                raise ValueError(f"Malformed task IDs: {malformed}")
+            
+            print(f"Batch submitted successfully in {elapsed:.3f}s")
+            log.info("   Batch ID: %s", batch_data['batch_id'])
+            log.info("   Tasks: %s", len(task_ids))
+            
+            return task_ids
+            
+        except Exception as e:
+            print(f"Batch submission failed: {e}")
+            return []
+    
+    async def test_task_status(self, task_id: str) -> dict:
         """Test task status checking"""
         print(f"\nTesting task status...")
         
         try:
-            response = self.session.get(f"{self.base_url}/research/{task_id}/status")
+            response = await self.session.get(f"/research/{task_id}/status")
             response.raise_for_status()
             
-            status_data = response.json()
+            status_data = orjson.loads(response.content)
             print(f"Task status retrieved")
-            print(f"   Task ID: {status_data['task_id']}")
-            print(f"   Status: {status_data['status']}")
-            print(f"   Progress: {status_data['progress']}%")
-            print(f"   Created: {status_data['created_at']}")
+            log.info("   Task ID: %s", status_data['task_id'])
+            log.info("   Status: %s", status_data['status'])
+            log.info("   Progress: %s%%", status_data['progress'])
+            log.info("   Created: %s", status_data['created_at'])
             
             return status_data
             
@@ -107,24 +167,24 @@ class FastAPITester:
             print(f"Task status check failed: {e}")
             return {}
     
-    def test_task_results(self, task_id: str) -> dict:
+    async def test_task_results(self, task_id: str) -> dict:
         """Test task results retrieval"""
         print(f"\nTesting task results...")
         
         try:
-            response = self.session.get(f"{self.base_url}/research/{task_id}")
+            response = await self.session.get(f"/research/{task_id}")
             response.raise_for_status()
             
-            results_data = response.json()
+            results_data = orjson.loads(response.content)
             print(f"Task results retrieved")
-            print(f"   Status: {results_data['status']}")
+            log.info("   Status: %s", results_data['status'])
             
             if results_data['status'] == 'completed':
                 result_preview = results_data['result'][:100] + "..." if len(results_data['result']) > 100 else results_data['result']
-                print(f"   Result preview: {result_preview}")
-                print(f"   Files generated: {len(results_data.get('files_generated', []))}")
+                log.info("   Result preview: %s", result_preview)
+                log.info("   Files generated: %s", len(results_data.get('files_generated', [])))
             elif results_data['status'] == 'failed':
-                print(f"   Error: {results_data.get('error', 'Unknown error')}")
+                log.warning("   Error: %s", results_data.get('error', 'Unknown error'))
             
             return results_data
             
@@ -132,22 +192,22 @@ class FastAPITester:
             print(f"Task results retrieval failed: {e}")
             return {}
     
-    def test_task_list(self) -> bool:
+    async def test_task_list(self) -> bool:
         """Test task listing"""
         print(f"\nTesting task list...")
         
         try:
-            response = self.session.get(f"{self.base_url}/research")
+            response = await self.session.get("/research")
             response.raise_for_status()
             
-            list_data = response.json()
+            list_data = orjson.loads(response.content)
             print(f"Task list retrieved")
-            print(f"   Total tasks: {list_data['total_tasks']}")
+            log.info("   Total tasks: %s", list_data['total_tasks'])
             
             if list_data['tasks']:
-                print("   Recent tasks:")
+                log.info("   Recent tasks:")
                 for task in list_data['tasks'][:3]:  # Show first 3
-                    print(f"     - {task['task_id'][:8]}... ({task['status']}) - {task['progress']}%")
+                    log.info("     - %s... (%s) - %s%%", task['task_id'][:8], task['status'], task['progress'])
             
             return True
             
@@ -155,90 +215,221 @@ class FastAPITester:
             print(f"Task list retrieval failed: {e}")
             return False
     
-    def wait_for_completion(self, task_id: str, max_wait: int = 120) -> dict:
-        """Wait for task completion with polling"""
+    async def wait_for_completion(self, task_id: str, max_wait: int = 120) -> dict:
+        """Wait for task completion by subscribing to its event stream"""
         print(f"\nWaiting for task completion (max {max_wait}s)...")
         
-        start_time = time.time()
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + max_wait
+        
+        try:
+            try:
+                status = await asyncio.wait_for(self._watch_events(task_id), timeout=max_wait)
+            except httpx.HTTPError as e:
+                # Some proxies buffer event streams; long-poll the status endpoint instead
+                print(f"Task event stream failed ({e}), falling back to long-polling")
+                status = await asyncio.wait_for(self._long_poll(task_id), timeout=max(deadline - loop.time(), 0))
+        except asyncio.TimeoutError:
+            print(f"Timeout reached after {max_wait}s")
+            return {}
+        except Exception as e:
+            print(f"Task event stream failed: {e}")
+            return {}
+        
+        if status in FINAL_STATUSES:
+            print(f"Task finished with status: {status}")
+            return await self.test_task_results(task_id)
+        
+        print(f"Event stream ended before task finished ({status or 'no events'})")
+        return {}
+    
+    async def wait_for_any(self, task_ids: list, max_wait: int = 120):
+        """Wait for several tasks at once, yielding (task_id, results) as each one finishes"""
+        async def wait_one(task_id: str) -> tuple:
+            return task_id, await self.wait_for_completion(task_id, max_wait=max_wait)
+        
+        waiters = [asyncio.ensure_future(wait_one(task_id)) for task_id in task_ids]
+        try:
+            for next_done in asyncio.as_completed(waiters):
+                yield await next_done
+        finally:
+            # Stop watching the rest if the caller breaks out early
+            for waiter in waiters:
+                waiter.cancel()
+    
+    async def _long_poll(self, task_id: str) -> str:
+        """Long-poll the status endpoint with ETags until the task finishes"""
+        etag = None
         
-        while time.time() - start_time < max_wait:
-            status_data = self.test_task_status(task_id)
+        while True:
+            headers = {"If-None-Match": etag} if etag else {}
+            response = await self.session.get(
+                f"/research/{task_id}/status",
+                params={"wait": LONG_POLL_WAIT},
+                headers=headers,
+                timeout=LONG_POLL_WAIT + 10
+            )
             
-            if not status_data:
-                break
+            # Nothing changed during the wait
+            if response.status_code == 304:
+                continue
             
-            status = status_data.get('status', '')
+            response.raise_for_status()
+            etag = response.headers.get("ETag")
+            status_data = orjson.loads(response.content)
             
-            if status in ['completed', 'failed', 'cancelled']:
-                print(f"Task finished with status: {status}")
-                return self.test_task_results(task_id)
+            status = status_data["status"]
+            if status in FINAL_STATUSES:
+                return status
             
-            print(f"   Still processing... ({status}, {status_data.get('progress', 0)}%)")
-            time.sleep(5)  # Wait 5 seconds between checks
+            log.info("   Still processing... (%s, %s%%)", status, status_data.get('progress', 0))
+    
+    async def _watch_events(self, task_id: str) -> str:
+        """Consume server-sent status events until the task finishes"""
+        status = ""
         
-        print(f"Timeout reached after {max_wait}s")
-        return {}
+        # Events only arrive on change, so don't apply a read timeout
+        async with self.session.stream("GET", f"/research/{task_id}/events", timeout=None) as response:
+            response.raise_for_status()
+            async for line in response.aiter_lines():
+                if not line.startswith("data:"):
+                    continue
+                
+                event = orjson.loads(line[len("data:"):])
+                status = event["status"]
+                if status in FINAL_STATUSES:
+                    break
+                
+                log.info("   Still processing... (%s, %s%%)", status, event.get('progress', 0))
+        
+        return status
     
-    def run_full_test(self, query: str = "Explain artificial intelligence in simple terms") -> bool:
+    async def run_full_test(self, query: str = "Explain artificial intelligence in simple terms") -> bool:
         """Run a complete API test"""
         print("Starting Full FastAPI Background Tasks Test")
         print("=" * 50)
         
         # Test 1: Health check
-        if not self.test_health_check():
+        if not await self.test_health_check():
             return False
         
         # Test 2: API info
-        if not self.test_api_info():
+        if not await self.test_api_info():
             return False
         
         # Test 3: Submit research
-        task_id = self.test_research_submission(query)
+        task_id = await self.test_research_submission(query)
         if not task_id:
             return False
         
         # Test 4: Check initial status
-        if not self.test_task_status(task_id):
+        if not await self.test_task_status(task_id):
             return False
         
         # Test 5: Wait for completion
-        final_results = self.wait_for_completion(task_id, max_wait=180)
+        final_results = await self.wait_for_completion(task_id, max_wait=180)
         
         # Test 6: List tasks
-        self.test_task_list()
+        await self.test_task_list()
         
         # Summary
         print("\n" + "=" * 50)
         if final_results and final_results.get('status') == 'completed':
             print("Full API test completed successfully!")
-            print(f"   Research query: {query}")
-            print(f"   Task ID: {task_id}")
-            print(f"   Final status: {final_results['status']}")
+            log.info("   Research query: %s", query)
+            log.info("   Task ID: %s", task_id)
+            log.info("   Final status: %s", final_results['status'])
             return True
         else:
             print("API test completed with issues")
             return False
+    
+    async def run_concurrent_test(self, queries: list, max_wait: int = 180) -> bool:
+        """Submit several research queries and wait for all of them concurrently"""
+        print(f"\nStarting concurrent test with {len(queries)} queries")
+        print("=" * 50)
+        
+        start_time = time.perf_counter()
+        task_ids = await asyncio.gather(*(self.test_research_submission(query) for query in queries))
+        submitted = [task_id for task_id in task_ids if task_id]
+        print(f"\nSubmitted {len(submitted)} tasks individually in {time.perf_counter() - start_time:.3f}s")
+        
+        # Check every task's initial status in parallel
+        await asyncio.gather(*(self.test_task_status(task_id) for task_id in submitted))
+        
+        completed = await self._count_completed(submitted, max_wait)
+        
+        print("\n" + "=" * 50)
+        print(f"Concurrent test: {completed}/{len(queries)} tasks completed")
+        return completed == len(queries)
+    
+    async def _count_completed(self, task_ids: list, max_wait: int) -> int:
+        """Wait for all tasks, reporting each as it finishes, and count the completed ones"""
+        completed = 0
+        
+        async for task_id, results in self.wait_for_any(task_ids, max_wait=max_wait):
+            status = results.get('status', 'unfinished')
+            log.info("   Finished: %s (%s)", task_id, status)
+            completed += status == 'completed'
+        
+        return completed
+    
+    async def run_batch_test(self, queries: list, max_wait: int = 180) -> bool:
+        """Submit queries through the batch endpoint and wait for all of them concurrently"""
+        print(f"\nStarting batch test with {len(queries)} queries")
+        print("=" * 50)
+        
+        task_ids = await self.test_batch_submission(queries)
+        if len(task_ids) != len(queries):
+            return False
+        
+        completed = await self._count_completed(task_ids, max_wait)
+        
+        print("\n" + "=" * 50)
+        print(f"Batch test: {completed}/{len(queries)} tasks completed")
+        return completed == len(queries)
+
+
+async def run_tests(api_url: str, queries: list) -> bool:
+    """Run the full test, plus concurrent and batch tests when several queries are given"""
+    tester = FastAPITester(api_url)
+    
+    try:
+        success = await tester.run_full_test(queries[0])
+        
+        if success and len(queries) > 1:
+            success = await tester.run_concurrent_test(queries)
+            success = await tester.run_batch_test(queries) and success
+        
+        return success
+    finally:
+        await tester.aclose()
 
 
 def main():
     """Main test function"""
+    # Show per-request details only when asked
+    verbose_flags = ("-v", "--verbose")
+    args = [arg for arg in sys.argv[1:] if arg not in verbose_flags]
+    verbose = len(args) != len(sys.argv) - 1
+    logging.basicConfig(level=logging.INFO if verbose else logging.WARNING, format="%(message)s")
+    
     # Get API URL from command line or use default
-    api_url = sys.argv[1] if len(sys.argv) > 1 else "http://localhost:8000"
+    api_url = args[0] if args else "http://localhost:8000"
     
-    # Get test query from command line or use default
-    test_query = sys.argv[2] if len(sys.argv) > 2 else "What are the benefits of renewable energy?"
+    # Get test queries from command line or use default
+    test_queries = args[1:] or ["What are the benefits of renewable energy?"]
     
     print(f"FastAPI Background Tasks Test")
     print(f"API URL: {api_url}")
-    print(f"Test Query: {test_query}")
+    print(f"Test Query: {test_queries[0]}")
+    if len(test_queries) > 1:
+        print(f"Concurrent Queries: {len(test_queries)}")
     print()
     
-    # Create tester instance
-    tester = FastAPITester(api_url)
-    
     try:
         # Run full test
-        success = tester.run_full_test(test_query)
+        success = asyncio.run(run_tests(api_url, test_queries))
         
         if success:
             print("\nAll tests passed! API is working correctly.")